@@ -1,7 +1,7 @@
 """
 FastAPI 메인 애플리케이션
 """
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 from loguru import logger
@@ -19,10 +19,13 @@ async def lifespan(app: FastAPI):
     """애플리케이션 라이프사이클 관리"""
     # Startup
     logger.info("Starting Mini Nore ML API")
+    # ML 초기화는 기본적으로 백그라운드 (process 모드의 워커 fork는 DB 연결 스레드보다 먼저)
+    await recommendations.ml_service.start()
     await connect_to_mongo()
     yield
     # Shutdown
     logger.info("Shutting down Mini Nore ML API")
+    recommendations.ml_service.shutdown()
     await close_mongo_connection()
 
 
@@ -65,6 +68,21 @@ async def health_check():
     return {"status": "healthy"}
 
 
+@app.get("/ready")
+async def readiness_check(response: Response, require_ml: bool = False):
+    """
+    준비 상태 확인
+
+    API(CRUD, 룰 기반 생성)는 기동 즉시 준비됨. ML 모델은 백그라운드에서 로드되며,
+    require_ml=true면 ML 준비 전까지 503 반환
+    """
+    ml_status = recommendations.ml_service.readiness()
+    if require_ml and not ml_status["ready"]:
+        response.status_code = 503
+
+    return {"status": "ready", "ml": ml_status}
+
+
 if __name__ == "__main__":
     import uvicorn
 
@@ -1,21 +1,48 @@
 """
 AI 추천 관련 API 라우트
 """
-from fastapi import APIRouter, HTTPException, Query
-from typing import List, Literal
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from typing import List, Literal, Optional
+import json
 from loguru import logger
 
 from api.schemas.composition import CompositionResponse, Composition
 from api.services.ml_service import MLService
+from models.transformer.constraints import ConstraintError, RemixSourceError, SceneConstraints
 
 router = APIRouter()
 ml_service = MLService()
 
 
+def scene_constraints(
+    include: List[str] = Query([], description="모든 씬에 반드시 포함할 소스 ID"),
+    exclude: List[str] = Query([], description="생성하지 않을 소스 ID"),
+    min_music: int = Query(0, ge=0, le=6, description="씬당 최소 음악 소스 수"),
+    max_music: Optional[int] = Query(None, ge=0, le=6, description="씬당 최대 음악 소스 수"),
+    min_ambience: int = Query(0, ge=0, le=6, description="씬당 최소 앰비언스 소스 수"),
+    max_ambience: Optional[int] = Query(None, ge=0, le=6, description="씬당 최대 앰비언스 소스 수")
+) -> Optional[SceneConstraints]:
+    """생성 제약 쿼리 파라미터 (지정하지 않으면 None)"""
+    constraints = SceneConstraints(
+        include=tuple(dict.fromkeys(include)),
+        exclude=tuple(dict.fromkeys(exclude)),
+        min_music=min_music,
+        max_music=max_music,
+        min_ambience=min_ambience,
+        max_ambience=max_ambience
+    )
+    return None if constraints == SceneConstraints() else constraints
+
+
 @router.post("/generate", response_model=CompositionResponse)
 async def generate_recommendation(
     pack: Literal["adventure", "combat", "shelter"] = Query(..., description="팩 선택"),
-    temperature: float = Query(1.0, ge=0.1, le=2.0, description="생성 다양성 (낮을수록 보수적)")
+    temperature: float = Query(1.0, ge=0.1, le=2.0, description="생성 다양성 (낮을수록 보수적)"),
+    model_version: Optional[str] = Query(None, pattern=r"^[\w.-]+$", description="모델 버전 (없으면 기본 모델)"),
+    seed: Optional[int] = Query(None, ge=0, description="난수 시드 (같은 시드면 같은 composition)"),
+    best_of: int = Query(1, ge=1, le=16, description="후보 개수 (음악성 점수가 가장 높은 것 반환)"),
+    constraints: Optional[SceneConstraints] = Depends(scene_constraints)
 ):
     """
     ML 모델을 사용해 새로운 composition 생성
@@ -25,6 +52,10 @@ async def generate_recommendation(
       - 낮음 (0.5): 학습된 패턴에 가까운 안전한 생성
       - 중간 (1.0): 균형잡힌 생성
       - 높음 (1.5+): 실험적이고 창의적인 생성
+    - **model_version**: 특정 버전 모델 사용 ({pack}_model_{version}.pth, 처음 사용 시 로드)
+    - **seed**: 같은 팩/temperature/시드/모델 버전이면 같은 composition (예: "오늘의 composition" 링크), 결과는 캐시됨
+    - **best_of**: 후보 N개를 한 배치로 생성해 음악성 점수가 가장 높은 composition 반환
+    - **include/exclude/min_*/max_***: 씬 생성 제약 (만족할 수 없으면 400)
     """
     try:
         logger.info(f"Generating composition for pack: {pack}, temperature: {temperature}")
@@ -32,7 +63,11 @@ async def generate_recommendation(
         # ML 모델로 composition 생성
         generated_composition = await ml_service.generate_composition(
             pack=pack,
-            temperature=temperature
+            temperature=temperature,
+            version=model_version,
+            seed=seed,
+            best_of=best_of,
+            constraints=constraints
         )
 
         # DB에 저장
@@ -62,19 +97,227 @@ async def generate_recommendation(
             is_ai_generated=composition.is_ai_generated
         )
 
+    except ConstraintError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Failed to generate composition: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.post("/generate/stream")
+async def generate_recommendation_stream(
+    pack: Literal["adventure", "combat", "shelter"] = Query(..., description="팩 선택"),
+    temperature: float = Query(1.0, ge=0.1, le=2.0, description="생성 다양성 (낮을수록 보수적)"),
+    model_version: Optional[str] = Query(None, pattern=r"^[\w.-]+$", description="모델 버전 (없으면 기본 모델)"),
+    seed: Optional[int] = Query(None, ge=0, description="난수 시드 (같은 시드면 같은 composition)")
+):
+    """
+    composition을 씬 단위로 생성하며 NDJSON으로 스트리밍
+
+    첫 씬이 디코딩되는 즉시 재생을 시작할 수 있다. 한 줄에 JSON 레코드 하나:
+
+    - `{"type": "scene", "scene": {...}}` - 씬 순서대로 16개
+    - `{"type": "done", "id": ..., "pack": ..., "model_version": ..., "created_at": ...}` - 저장된 composition
+    - `{"type": "error", "detail": ...}` - 스트리밍 도중 실패한 경우
+    """
+    logger.info(f"Streaming composition for pack: {pack}, temperature: {temperature}")
+
+    async def stream():
+        try:
+            async for kind, payload in ml_service.stream_composition(
+                pack=pack,
+                temperature=temperature,
+                version=model_version,
+                seed=seed
+            ):
+                if kind == "scene":
+                    yield json.dumps({"type": "scene", "scene": payload}) + "\n"
+                    continue
+
+                # DB에 저장
+                composition = Composition(
+                    pack=payload["pack"],
+                    scenes=payload["scenes"],
+                    masterVolume=payload.get("masterVolume", 1.0),
+                    musicVolume=payload.get("musicVolume", 1.0),
+                    ambienceVolume=payload.get("ambienceVolume", 1.0),
+                    is_ai_generated=True,
+                    model_version=payload.get("model_version", "v1.0")
+                )
+
+                composition.calculate_features()
+                await composition.insert()
+
+                logger.info(f"Streamed and saved composition {composition.id}")
+
+                yield json.dumps({
+                    "type": "done",
+                    "id": str(composition.id),
+                    "pack": composition.pack,
+                    "model_version": composition.model_version,
+                    "created_at": composition.created_at.isoformat()
+                }) + "\n"
+
+        except Exception as e:
+            # 응답 상태 코드는 이미 전송되었으므로 에러 레코드로 전달
+            logger.error(f"Failed to stream composition: {e}")
+            yield json.dumps({"type": "error", "detail": str(e)}) + "\n"
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+
+@router.post("/generate/batch", response_model=List[CompositionResponse])
+async def generate_recommendation_batch(
+    pack: Literal["adventure", "combat", "shelter"] = Query(..., description="팩 선택"),
+    count: int = Query(20, ge=1, le=50, description="생성할 composition 개수"),
+    temperature: float = Query(1.0, ge=0.1, le=2.0, description="생성 다양성 (낮을수록 보수적)"),
+    best_of: int = Query(1, ge=1, le=4, description="composition당 후보 개수 (음악성 점수 상위 count개 반환)"),
+    constraints: Optional[SceneConstraints] = Depends(scene_constraints)
+):
+    """
+    ML 모델로 여러 composition을 한 번에 생성 (플레이리스트용)
+
+    - **pack**: 어떤 팩의 음악을 생성할지
+    - **count**: 생성할 composition 개수 (1~50)
+    - **temperature**: 생성 다양성 조절 (0.1~2.0)
+    - **best_of**: count × best_of개 후보를 생성해 음악성 점수 상위 count개 반환
+    - **include/exclude/min_*/max_***: 씬 생성 제약 (만족할 수 없으면 400)
+
+    모든 composition을 하나의 배치로 디코딩하고 한 번의 insert_many로 저장
+    """
+    try:
+        logger.info(f"Generating {count} compositions for pack: {pack}, temperature: {temperature}")
+
+        # ML 모델로 composition 배치 생성
+        generated_compositions = await ml_service.generate_compositions(
+            pack=pack,
+            count=count,
+            temperature=temperature,
+            best_of=best_of,
+            constraints=constraints
+        )
+
+        compositions = []
+        for generated_composition in generated_compositions:
+            composition = Composition(
+                pack=generated_composition["pack"],
+                scenes=generated_composition["scenes"],
+                masterVolume=generated_composition.get("masterVolume", 1.0),
+                musicVolume=generated_composition.get("musicVolume", 1.0),
+                ambienceVolume=generated_composition.get("ambienceVolume", 1.0),
+                is_ai_generated=True,
+                model_version=generated_composition.get("model_version", "v1.0")
+            )
+            composition.calculate_features()
+            compositions.append(composition)
+
+        # DB에 한 번에 저장
+        result = await Composition.insert_many(compositions)
+        for composition, inserted_id in zip(compositions, result.inserted_ids):
+            composition.id = inserted_id
+
+        logger.info(f"Generated and saved {len(compositions)} compositions for {pack}")
+
+        return [
+            CompositionResponse(
+                id=str(composition.id),
+                pack=composition.pack,
+                scenes=composition.scenes,
+                created_at=composition.created_at,
+                rating=composition.rating,
+                likes=composition.likes,
+                plays=composition.plays,
+                is_ai_generated=composition.is_ai_generated
+            )
+            for composition in compositions
+        ]
+
+    except ConstraintError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Failed to generate composition batch: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/remix/{composition_id}", response_model=CompositionResponse)
+async def remix_composition(
+    composition_id: str,
+    temperature: float = Query(1.0, ge=0.1, le=2.0, description="생성 다양성 (낮을수록 원본에 가까움)"),
+    model_version: Optional[str] = Query(None, pattern=r"^[\w.-]+$", description="모델 버전 (없으면 기본 모델)"),
+    seed: Optional[int] = Query(None, ge=0, description="난수 시드 (같은 시드면 같은 composition)")
+):
+    """
+    기존 composition을 바탕으로 새로운 composition 생성 (remix)
+
+    원본을 인코딩한 결과를 디코더 메모리로 사용한다. 인코딩 결과는 (composition, 모델 버전)별로
+    캐시되므로 같은 composition을 다시 remix할 때는 인코더를 실행하지 않는다.
+    """
+    try:
+        source = await Composition.get(composition_id)
+        if not source:
+            raise HTTPException(status_code=404, detail="Composition not found")
+
+        logger.info(f"Remixing composition {composition_id}, temperature: {temperature}")
+
+        remixed = await ml_service.remix_composition(
+            composition={
+                "pack": source.pack,
+                "scenes": [scene.dict() for scene in source.scenes]
+            },
+            composition_id=composition_id,
+            temperature=temperature,
+            version=model_version,
+            seed=seed
+        )
+
+        # DB에 저장
+        composition = Composition(
+            pack=remixed["pack"],
+            scenes=remixed["scenes"],
+            masterVolume=remixed.get("masterVolume", 1.0),
+            musicVolume=remixed.get("musicVolume", 1.0),
+            ambienceVolume=remixed.get("ambienceVolume", 1.0),
+            is_ai_generated=True,
+            model_version=remixed.get("model_version", "v1.0")
+        )
+
+        composition.calculate_features()
+        await composition.insert()
+
+        logger.info(f"Remixed {composition_id} into composition {composition.id}")
+
+        return CompositionResponse(
+            id=str(composition.id),
+            pack=composition.pack,
+            scenes=composition.scenes,
+            created_at=composition.created_at,
+            rating=composition.rating,
+            likes=composition.likes,
+            plays=composition.plays,
+            is_ai_generated=composition.is_ai_generated
+        )
+
+    except HTTPException:
+        raise
+    except RemixSourceError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except Exception as e:
+        logger.error(f"Failed to remix composition {composition_id}: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @router.get("/examples/{pack}", response_model=List[CompositionResponse])
 async def get_example_recommendations(
     pack: Literal["adventure", "combat", "shelter"],
-    count: int = Query(3, ge=1, le=10, description="가져올 예시 개수")
+    count: int = Query(3, ge=1, le=10, description="가져올 예시 개수"),
+    best_of: int = Query(1, ge=1, le=8, description="부족한 예시를 새로 생성할 때 예시당 후보 개수")
 ):
     """
     특정 팩의 AI 생성 예시 composition들 가져오기
     (높은 평점/인기도 기준 정렬)
+
+    저장된 예시가 부족하면 새로 생성한다. best_of > 1이면 후보를 한 배치로 생성해
+    음악성 점수 상위 composition을 사용한다.
     """
     try:
         # AI 생성 composition 중 해당 팩의 것만 가져오기
@@ -88,12 +331,18 @@ async def get_example_recommendations(
             ("plays", -1)
         ]).limit(count).to_list()
 
-        # 충분한 데이터가 없으면 새로 생성
+        # 충분한 데이터가 없으면 새로 생성 (미리 생성해 둔 풀에서 먼저 가져옴)
         if len(compositions) < count:
             logger.info(f"Not enough examples for {pack}, generating {count - len(compositions)} more")
-            for _ in range(count - len(compositions)):
-                try:
-                    new_comp_data = await ml_service.generate_composition(pack=pack)
+            try:
+                generated_compositions = await ml_service.generate_compositions(
+                    pack=pack,
+                    count=count - len(compositions),
+                    best_of=best_of
+                )
+
+                new_comps = []
+                for new_comp_data in generated_compositions:
                     new_comp = Composition(
                         pack=new_comp_data["pack"],
                         scenes=new_comp_data["scenes"],
@@ -101,10 +350,14 @@ async def get_example_recommendations(
                         model_version=new_comp_data.get("model_version", "v1.0")
                     )
                     new_comp.calculate_features()
-                    await new_comp.insert()
-                    compositions.append(new_comp)
-                except Exception as e:
-                    logger.error(f"Failed to generate additional composition: {e}")
+                    new_comps.append(new_comp)
+
+                result = await Composition.insert_many(new_comps)
+                for new_comp, inserted_id in zip(new_comps, result.inserted_ids):
+                    new_comp.id = inserted_id
+                compositions.extend(new_comps)
+            except Exception as e:
+                logger.error(f"Failed to generate additional compositions: {e}")
 
         return [
             CompositionResponse(
@@ -0,0 +1,131 @@
+"""
+동시 생성 요청 마이크로배칭
+"""
+import asyncio
+from typing import Any, Awaitable, Callable, List, Optional, Set, Tuple
+from loguru import logger
+
+
+class MicroBatcher:
+    """
+    짧은 시간 창 안에 들어온 요청을 모아 한 번의 배치 생성으로 처리
+
+    첫 요청이 도착한 뒤 max_wait_ms가 지나거나 max_batch_size개가 모이면
+    run_batch(requests)를 한 번 호출하고, 결과를 요청 순서대로 각 호출자의 future에 돌려준다.
+
+    배치는 별도 task로 실행하고 바로 다음 배치를 모으므로 최대 max_in_flight개 배치가 동시에 실행된다.
+    실행 슬롯이 모두 차 있는 동안 들어온 요청은 다음 배치에 모인다.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        run_batch: Callable[[List[Any]], Awaitable[List[Any]]],
+        max_batch_size: int = 16,
+        max_wait_ms: float = 5.0,
+        max_in_flight: int = 1
+    ):
+        """
+        Args:
+            name: 로깅용 이름 (예: 팩 이름)
+            run_batch: 요청 리스트를 받아 같은 길이의 결과 리스트를 반환하는 코루틴 함수
+            max_batch_size: 한 배치의 최대 요청 수 (1이면 배칭 없음)
+            max_wait_ms: 첫 요청 이후 다음 요청을 기다리는 최대 시간 (ms)
+            max_in_flight: 동시에 실행할 최대 배치 수 (보통 추론 워커 수)
+        """
+        self.name = name
+        self.run_batch = run_batch
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self.max_in_flight = max(1, max_in_flight)
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._batches: Set[asyncio.Task] = set()  # 실행 중인 배치 task (GC 방지)
+
+    async def submit(self, request: Any) -> Any:
+        """
+        요청을 큐에 넣고 배치 처리 결과를 기다림
+
+        Args:
+            request: run_batch에 전달될 요청 (예: temperature)
+
+        Returns:
+            이 요청에 해당하는 결과
+        """
+        self._ensure_worker()
+
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((request, future))
+
+        return await future
+
+    def _ensure_worker(self):
+        """현재 이벤트 루프에서 배치 워커 시작"""
+        if self._worker is None or self._worker.done():
+            self._queue = asyncio.Queue()
+            self._slots = asyncio.Semaphore(self.max_in_flight)
+            self._worker = asyncio.get_running_loop().create_task(self._run())
+
+    async def _collect(self) -> List[Tuple[Any, asyncio.Future]]:
+        """첫 요청을 기다린 뒤, 시간 창이 닫히거나 배치가 찰 때까지 요청 수집"""
+        loop = asyncio.get_running_loop()
+
+        batch = [await self._queue.get()]
+        deadline = loop.time() + self.max_wait
+
+        while len(batch) < self.max_batch_size:
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                continue
+
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+
+        # 이미 취소된 요청은 제외
+        return [(request, future) for request, future in batch if not future.done()]
+
+    async def _run(self):
+        """배치 워커 루프 (실행 슬롯을 얻은 뒤 배치를 모아 별도 task로 실행)"""
+        loop = asyncio.get_running_loop()
+
+        while True:
+            await self._slots.acquire()
+            try:
+                batch = await self._collect()
+            except BaseException:
+                self._slots.release()
+                raise
+
+            if not batch:
+                self._slots.release()
+                continue
+
+            task = loop.create_task(self._dispatch(batch))
+            self._batches.add(task)
+            task.add_done_callback(self._batches.discard)
+
+    async def _dispatch(self, batch: List[Tuple[Any, asyncio.Future]]):
+        """배치 하나를 실행하고 결과를 각 future에 전달"""
+        logger.debug(f"[{self.name}] Running batch of {len(batch)} requests")
+
+        try:
+            results = await self.run_batch([request for request, _ in batch])
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        finally:
+            self._slots.release()
+
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
@@ -0,0 +1,93 @@
+"""
+모델 추론 전용 실행기 (이벤트 루프 블로킹 방지)
+"""
+import asyncio
+import threading
+import time
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+
+def _timed_call(fn: Callable[..., Any], submitted_at: float, args: tuple, kwargs: dict):
+    """워커에서 실행되어 (대기 시간, 결과)를 반환 (프로세스 풀에서도 pickle 가능)"""
+    wait = time.time() - submitted_at
+    return wait, fn(*args, **kwargs)
+
+
+class InferenceExecutor:
+    """
+    CPU 바운드 torch 추론을 이벤트 루프 밖의 제한된 풀에서 실행
+
+    기본은 스레드 풀이며, 프로세스 풀(concurrent.futures.Executor)을 넘겨받을 수도 있다.
+    대기열 깊이와 대기 시간을 기록해 /model/status에서 풀 크기 조정에 활용한다.
+    """
+
+    def __init__(self, max_workers: int = 1, executor: Optional[Executor] = None):
+        """
+        Args:
+            max_workers: 추론 워커 수
+            executor: 사용할 실행기 (None이면 max_workers 스레드 풀 생성)
+        """
+        self.max_workers = max(1, max_workers)
+        self._executor = executor or ThreadPoolExecutor(
+            max_workers=self.max_workers,
+            thread_name_prefix="inference"
+        )
+
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._max_running = 0
+        self._completed = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+
+    async def run(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """
+        함수를 추론 워커에서 실행하고 결과를 기다림
+
+        Args:
+            fn: 실행할 (블로킹) 함수 - 프로세스 풀이면 모듈 수준 함수여야 함
+            *args, **kwargs: fn 인자
+
+        Returns:
+            fn의 반환값
+        """
+        with self._lock:
+            self._in_flight += 1
+            self._max_running = max(self._max_running, min(self._in_flight, self.max_workers))
+
+        try:
+            future = self._executor.submit(_timed_call, fn, time.time(), args, kwargs)
+            wait, result = await asyncio.wrap_future(future)
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+
+        with self._lock:
+            self._completed += 1
+            self._total_wait += wait
+            self._max_wait = max(self._max_wait, wait)
+
+        return result
+
+    def is_idle(self) -> bool:
+        """실행 중이거나 대기 중인 작업이 없는지"""
+        with self._lock:
+            return self._in_flight == 0
+
+    def stats(self) -> Dict:
+        """대기열 깊이 및 대기 시간 통계"""
+        with self._lock:
+            return {
+                "max_workers": self.max_workers,
+                "queue_depth": max(0, self._in_flight - self.max_workers),
+                "running": min(self._in_flight, self.max_workers),
+                "max_running": self._max_running,
+                "completed": self._completed,
+                "avg_wait_ms": self._total_wait / self._completed * 1000 if self._completed else 0.0,
+                "max_wait_ms": self._max_wait * 1000
+            }
+
+    def shutdown(self):
+        """실행기 종료"""
+        self._executor.shutdown(wait=False)
@@ -1,50 +1,285 @@
 """
 ML 모델 서비스 (생성 및 학습 관리)
 """
+import asyncio
 import os
+import threading
+import time
 import uuid
-from typing import Dict, List, Optional, Literal
+from typing import TYPE_CHECKING, AsyncIterator, Dict, List, Optional, Literal, Tuple
 from loguru import logger
-import torch
 import numpy as np
 
-from models.transformer.composition_generator import CompositionGenerator
-from training.preprocessing.data_processor import DataProcessor
+from api.services.batching import MicroBatcher
+from api.services.executor import InferenceExecutor
+from api.services.model_registry import ModelRegistry
+from api.services.pool import CompositionPool
+from api.services.result_cache import ResultCache
+from models.transformer.constraints import ConstraintError, SceneConstraints
+
+# torch/모델 모듈은 import 비용이 커서 ML 초기화 시점에 import (API는 먼저 기동)
+if TYPE_CHECKING:
+    from models.transformer.composition_generator import CompositionGenerator
+
+PACKS = ["adventure", "combat", "shelter"]
+
+# 룰 기반 생성의 팩별 추천 소스 (수작업으로 큐레이션된 조합)
+RULE_BASED_SOURCES = {
+    "adventure": {
+        "music": ["adv-hero", "adv-drums", "adv-flute", "adv-strings"],
+        "ambience": ["adv-birds", "adv-wind", "adv-grass"]
+    },
+    "combat": {
+        "music": ["cmb-warrior", "cmb-war_drums", "cmb-horn", "cmb-heavy_bass"],
+        "ambience": ["cmb-sword_clash", "cmb-fire", "cmb-thunder"]
+    },
+    "shelter": {
+        "music": ["shl-melody", "shl-piano", "shl-harp", "shl-pad"],
+        "ambience": ["shl-fireplace", "shl-rain", "shl-night"]
+    }
+}
 
 
 class MLService:
     """ML 모델 서비스 클래스"""
 
     def __init__(self):
-        self.models = {}  # pack별 모델 저장
         self.model_path = os.getenv("MODEL_PATH", "./models/checkpoints")
-        self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+        self.device = None  # ML 초기화 후 설정
+
+        # 팩/버전별 모델은 처음 사용할 때 로드, 메모리 예산을 넘으면 LRU로 내림
+        budget_mb = float(os.getenv("MODEL_MEMORY_BUDGET_MB", 0))
+        self.registry = ModelRegistry(
+            model_path=self.model_path,
+            load_fn=self._load_model,
+            budget_bytes=int(budget_mb * (1 << 20))
+        )
+
+        # 동시 생성 요청 마이크로배칭 설정 (지연 시간 ↔ 처리량)
+        self.max_batch_size = int(os.getenv("GENERATION_MAX_BATCH_SIZE", 16))
+        self.max_wait_ms = float(os.getenv("GENERATION_MAX_WAIT_MS", 5))
+        self.batchers = {}  # (pack, version)별 MicroBatcher
+        self._checkpoint_versions = {}  # (체크포인트 경로, 수정 시각) → 모델 버전 (process 모드)
+
+        # 추론은 이벤트 루프 밖에서 실행
+        # - thread: 제한된 스레드 풀 (기본)
+        # - process: 모델을 공유하는 워커 프로세스 N개 (CPU 멀티코어 처리량, ML 초기화 시 생성)
+        # 워커에 넘길 수 없는 stream/remix 추론은 이 프로세스의 스레드 풀(local_executor)에서 실행
+        self.inference_mode = os.getenv("INFERENCE_MODE", "thread")
+        self.torch_threads = os.getenv("TORCH_NUM_THREADS")
+        self.inference_threads = int(os.getenv("INFERENCE_THREADS", 1))
+        self.executor = None
+        self.local_executor = None
+        self._worker_status_lock = asyncio.Lock()  # 워커 상태 조회는 한 번에 하나씩 (barrier 공유)
+        if self.inference_mode != "process":
+            self.executor = InferenceExecutor(max_workers=self.inference_threads)
+            self.local_executor = self.executor
+
+        # ML 초기화 (torch import + 기본 모델 로드) 상태, 완료 전에는 룰 기반 생성
+        self.startup_mode = os.getenv("ML_STARTUP", "background")
+        self.preload_packs = [pack for pack in os.getenv("MODEL_PRELOAD", ",".join(PACKS)).split(",") if pack]
+        self.ml_ready = threading.Event()
+        self.ml_error = None
+        self.ml_init_seconds = None
+        self._ml_task = None
+
+        # 시드 지정 생성 결과 캐시 (_cache_key() → composition)
+        self.result_cache = ResultCache(
+            max_size=int(os.getenv("GENERATION_CACHE_SIZE", 1024)),
+            ttl_seconds=float(os.getenv("GENERATION_CACHE_TTL_SECONDS", 3600))
+        )
+
+        # remix용 인코더 출력 캐시 ((composition id, version, model_version) → 디코더 메모리)
+        self.memory_cache = ResultCache(
+            max_size=int(os.getenv("REMIX_MEMORY_CACHE_SIZE", 256)),
+            ttl_seconds=0,
+            copy_values=False
+        )
+
+        # 기본 모델로 미리 생성해 둔 composition 풀 (추론 워커가 놀 때 채움)
+        pool_temperatures = os.getenv("GENERATION_POOL_TEMPERATURES", "1.0")
+        self.pool = CompositionPool(
+            produce=self._produce_for_pool,
+            is_idle=self._inference_idle,
+            packs=PACKS,
+            temperatures=[float(t) for t in pool_temperatures.split(",") if t],
+            capacity=int(os.getenv("GENERATION_POOL_SIZE", 32))
+        )
+
+        logger.info(f"MLService initialized (inference mode: {self.inference_mode}, ML startup: {self.startup_mode})")
+
+    async def start(self):
+        """
+        ML 초기화 시작 (애플리케이션 시작 시 호출)
+
+        - background: 이벤트 루프 밖에서 초기화, API와 룰 기반 생성은 바로 응답
+        - blocking: 초기화가 끝난 뒤 서버 기동 (process 모드는 항상 blocking)
+        """
+        if self.startup_mode == "blocking" or self.inference_mode == "process":
+            # process 모드는 다른 스레드가 생기기 전에 워커를 fork 해야 함
+            self.initialize_ml()
+        else:
+            self._ml_task = asyncio.create_task(asyncio.to_thread(self.initialize_ml))
+
+        self.pool.start()
+
+    def initialize_ml(self):
+        """torch import, 디바이스/스레드 설정, 기본 모델 로드 (블로킹)"""
+        start = time.perf_counter()
 
-        logger.info(f"MLService initialized on device: {self.device}")
+        try:
+            import torch
+
+            self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+
+            if self.inference_mode == "process":
+                from api.services.workers import create_worker_pool
 
-        # 모델 로드 시도
-        self._load_models()
+                # 워커가 가중치를 공유하도록 fork 전에 기본 모델 로드 (예산 때문에 내려가지 않도록 고정)
+                self.registry.preload(PACKS, pin=True)
 
-    def _load_models(self):
-        """저장된 모델 로드"""
-        for pack in ["adventure", "combat", "shelter"]:
-            model_file = os.path.join(self.model_path, f"{pack}_model.pth")
+                num_processes = int(os.getenv("INFERENCE_PROCESSES", os.cpu_count() or 1))
+                pool = create_worker_pool(self.registry, num_processes, int(self.torch_threads or 1))
+                self.executor = InferenceExecutor(max_workers=num_processes, executor=pool)
+                logger.info(f"Started {num_processes} inference worker processes")
 
-            if os.path.exists(model_file):
-                try:
-                    self.models[pack] = CompositionGenerator.load(model_file, self.device)
-                    logger.info(f"Loaded model for pack: {pack}")
-                except Exception as e:
-                    logger.error(f"Failed to load model for {pack}: {e}")
-                    self.models[pack] = None
+                # fork 이후 메인 프로세스의 stream/remix 추론용 스레드 풀 (워커와 같은 torch 스레드 설정)
+                self.local_executor = InferenceExecutor(max_workers=self.inference_threads)
+                if self.torch_threads:
+                    torch.set_num_threads(int(self.torch_threads))
             else:
-                logger.warning(f"No saved model found for {pack}")
-                self.models[pack] = None
+                if self.torch_threads:
+                    torch.set_num_threads(int(self.torch_threads))
+
+                # 추론 스레드마다 배치를 동시에 실행하고 intra-op 스레드 풀은 프로세스 전체가 공유
+                cores = os.cpu_count() or 1
+                if self.inference_threads * torch.get_num_threads() > cores:
+                    logger.warning(
+                        f"INFERENCE_THREADS={self.inference_threads} x torch threads={torch.get_num_threads()} "
+                        f"exceeds {cores} CPU cores, set TORCH_NUM_THREADS lower to avoid oversubscription"
+                    )
+                self.registry.preload(self.preload_packs)
+
+        except Exception as e:
+            self.ml_error = str(e)
+            logger.error(f"ML initialization failed: {e}, serving rule-based generation only")
+            return
+
+        self.ml_init_seconds = time.perf_counter() - start
+        self.ml_ready.set()
+        logger.info(f"ML ready on device: {self.device} ({self.ml_init_seconds:.2f}s)")
+
+    def readiness(self) -> Dict:
+        """ML 준비 상태 (준비 전에는 룰 기반 생성으로 응답)"""
+        if self.ml_ready.is_set():
+            state = "ready"
+        elif self.ml_error is not None:
+            state = "failed"
+        else:
+            state = "starting"
+
+        return {
+            "ready": self.ml_ready.is_set(),
+            "state": state,
+            "error": self.ml_error,
+            "init_seconds": self.ml_init_seconds,
+            "loaded_models": len(self.registry.loaded_models())
+        }
+
+    def _inference_idle(self) -> bool:
+        """ML이 준비됐고 추론 워커가 놀고 있는지 (풀 채우기 조건)"""
+        return self.ml_ready.is_set() and self.executor is not None and self.executor.is_idle()
+
+    async def _produce_for_pool(self, pack: str, temperature: float, count: int) -> List[Dict]:
+        """풀 채우기용 생성 (기본 모델이 없으면 빈 리스트)"""
+        _, model_version = await self._resolve_model(pack)
+        if model_version is None:
+            return []
+
+        return await self._generate_batch(pack, [temperature] * count)
+
+    def _load_model(self, pack: str, model_file: str) -> "CompositionGenerator":
+        """체크포인트에서 모델 로드 (팩별 백엔드/양자화 설정 적용)"""
+        from models.transformer.composition_generator import CompositionGenerator
+
+        backend = self._get_model_setting(pack, "MODEL_BACKEND", "eager")
+        quantize = self._get_model_setting(pack, "MODEL_QUANTIZE", None)
+        logger.info(f"Loading model for pack: {pack} (backend: {backend}, quantize: {quantize})")
+
+        return CompositionGenerator.load(model_file, self.device, backend=backend, quantize=quantize)
+
+    async def _get_model(self, pack: str, version: Optional[str] = None) -> Optional["CompositionGenerator"]:
+        """모델 가져오기 (처음 사용이면 이벤트 루프 밖에서 로드, ML 초기화 전이면 None)"""
+        if not self.ml_ready.is_set():
+            return None
+
+        model = self.registry.get_resident(pack, version)
+        if model is None:
+            model = await asyncio.to_thread(self.registry.get, pack, version)
+        return model
+
+    async def _resolve_model(
+        self,
+        pack: str,
+        version: Optional[str] = None
+    ) -> Tuple[Optional["CompositionGenerator"], Optional[str]]:
+        """
+        생성 요청에 쓸 모델과 모델 버전 (모델이 없거나 ML 초기화 전이면 (None, None))
+
+        process 모드에서는 워커가 추론하므로 이 프로세스에 상주하지 않는 모델은 로드하지 않고
+        체크포인트에서 버전만 읽는다 (모델은 None, 제약 검증도 워커에서).
+        """
+        if not self.ml_ready.is_set():
+            return None, None
+
+        if self.inference_mode != "process":
+            model = await self._get_model(pack, version)
+            return model, model.version if model is not None else None
+
+        model = self.registry.get_resident(pack, version)
+        if model is not None:
+            return model, model.version
+
+        return None, await asyncio.to_thread(self._checkpoint_version, pack, version)
+
+    def _checkpoint_version(self, pack: str, version: Optional[str] = None) -> Optional[str]:
+        """체크포인트의 모델 버전 (파일이 없으면 None, 파일 수정 시각별로 캐시)"""
+        path = self.registry.checkpoint_path(pack, version)
+        if not os.path.exists(path):
+            return None
+
+        key = (path, os.path.getmtime(path))
+        if key not in self._checkpoint_versions:
+            from models.transformer.composition_generator import CompositionGenerator
+
+            self._checkpoint_versions[key] = CompositionGenerator.checkpoint_version(path)
+        return self._checkpoint_versions[key]
+
+    @staticmethod
+    def _cache_key(
+        pack: str,
+        version: Optional[str],
+        model_version: str,
+        temperature: float,
+        seed: int,
+        best_of: int = 1,
+        constraints: Optional[SceneConstraints] = None
+    ) -> Tuple:
+        """시드 생성 결과 캐시 키 (/generate, /generate/stream이 같은 항목을 공유)"""
+        return (pack, version, model_version, temperature, seed, best_of, constraints)
+
+    def _get_model_setting(self, pack: str, name: str, default: Optional[str]) -> Optional[str]:
+        """팩별 모델 설정 (<NAME>_<PACK> > <NAME> > default)"""
+        return os.getenv(f"{name}_{pack.upper()}", os.getenv(name, default)) or default
 
     async def generate_composition(
         self,
         pack: Literal["adventure", "combat", "shelter"],
-        temperature: float = 1.0
+        temperature: float = 1.0,
+        version: Optional[str] = None,
+        seed: Optional[int] = None,
+        best_of: int = 1,
+        constraints: Optional[SceneConstraints] = None
     ) -> Dict:
         """
         새로운 composition 생성
@@ -52,112 +287,453 @@ class MLService:
         Args:
             pack: 팩 종류
             temperature: 생성 다양성 (0.1~2.0)
+            version: 모델 버전 (None이면 기본 모델)
+            seed: 난수 시드 (같은 팩/temperature/시드/모델 버전이면 같은 결과, 결과 캐시 사용)
+            best_of: 후보 개수 (1보다 크면 한 배치로 디코딩해 음악성 점수가 가장 높은 것 반환)
+            constraints: 씬 생성 제약 (None이면 기본 제약, 모델이 없으면 적용되지 않음)
 
         Returns:
             생성된 composition 데이터
+
+        Raises:
+            ConstraintError: 모델 소스로 만족할 수 없는 제약
         """
         try:
-            model = self.models.get(pack)
+            # 미리 생성해 둔 composition이 있으면 바로 응답 (시드/제약 지정, best-of 요청 제외)
+            if version is None and seed is None and best_of == 1 and constraints is None:
+                pooled = self.pool.take(pack, temperature)
+                if pooled:
+                    return pooled[0]
+
+            model, model_version = await self._resolve_model(pack, version)
 
             # 모델이 없으면 룰 기반 생성 (fallback)
-            if model is None:
+            if model_version is None:
                 logger.warning(f"No model for {pack}, using rule-based generation")
-                return self._rule_based_generation(pack)
+                return self._rule_based_generation(pack, seed)
 
-            # ML 모델로 생성
-            with torch.no_grad():
-                composition_data = model.generate(temperature=temperature)
+            # 배치에 합치기 전에 검증 (잘못된 제약이 같은 배치의 다른 요청을 실패시키지 않도록)
+            if model is not None:
+                model.constraint_masks(constraints)
 
-            # 포맷 변환
-            formatted_composition = self._format_composition(composition_data, pack)
-            formatted_composition["model_version"] = model.version
+            async def generate() -> Dict:
+                if best_of > 1:
+                    # 후보 자체가 하나의 배치이므로 마이크로배칭 없이 생성
+                    return (await self._generate_top_k(pack, 1, best_of, temperature, version, seed, constraints))[0]
+
+                if model is None and constraints is not None:
+                    # 워커에서 검증되는 제약은 다른 요청과 배치에 합치지 않음
+                    return (await self._generate_batch(pack, [temperature], version, [seed], [constraints]))[0]
+
+                # 같은 팩/버전의 동시 요청과 모아서 배치 생성
+                return await self._get_batcher(pack, version).submit((temperature, seed, constraints))
+
+            if seed is None:
+                return await generate()
 
-            return formatted_composition
+            cache_key = self._cache_key(pack, version, model_version, temperature, seed, best_of, constraints)
+            composition = self.result_cache.get(cache_key)
+            if composition is None:
+                composition = await generate()
+                self.result_cache.put(cache_key, composition)
 
+            return composition
+
+        except ConstraintError:
+            raise
         except Exception as e:
             logger.error(f"Generation failed: {e}, falling back to rule-based")
-            return self._rule_based_generation(pack)
+            return self._rule_based_generation(pack, seed)
+
+    def _get_batcher(self, pack: str, version: Optional[str] = None) -> MicroBatcher:
+        """팩/버전별 마이크로배처 (첫 사용 시 생성)"""
+        key = (pack, version)
+        if key not in self.batchers:
+            async def run_batch(
+                requests: List[Tuple[float, Optional[int], Optional[SceneConstraints]]]
+            ) -> List[Dict]:
+                temperatures, seeds, constraints = zip(*requests)
+                return await self._generate_batch(pack, list(temperatures), version, list(seeds), list(constraints))
+
+            self.batchers[key] = MicroBatcher(
+                name=pack if version is None else f"{pack}:{version}",
+                run_batch=run_batch,
+                max_batch_size=self.max_batch_size,
+                max_wait_ms=self.max_wait_ms,
+                max_in_flight=self.executor.max_workers  # 추론 워커 수만큼 배치를 동시에 실행
+            )
+
+        return self.batchers[key]
+
+    async def _generate_batch(
+        self,
+        pack: str,
+        temperatures: List[float],
+        version: Optional[str] = None,
+        seeds: Optional[List[Optional[int]]] = None,
+        constraints: Optional[List[Optional[SceneConstraints]]] = None
+    ) -> List[Dict]:
+        """
+        모델로 composition 배치 생성 (요청별 temperature/시드/제약, 추론 워커에서 실행)
 
-    def _rule_based_generation(self, pack: str) -> Dict:
+        Args:
+            pack: 팩 종류
+            temperatures: composition별 temperature
+            version: 모델 버전 (None이면 기본 모델)
+            seeds: composition별 난수 시드 (None이면 모두 무작위)
+            constraints: composition별 생성 제약 (None이면 기본 제약)
+
+        Returns:
+            포맷 변환된 composition 리스트
         """
-        룰 기반 composition 생성 (ML 모델이 없을 때 fallback)
-        음악 이론에 기반한 간단한 패턴 생성
+        if self.inference_mode == "process":
+            from api.services.workers import generate_in_worker
+
+            # 모델은 워커에만 로드 (버전도 워커가 반환)
+            model_version, compositions = await self.executor.run(
+                generate_in_worker, pack, version, temperatures, seeds, constraints
+            )
+        else:
+            model = await self._get_model(pack, version)
+            compositions = await self.executor.run(
+                model.generate_batch, len(temperatures),
+                temperatures=temperatures, seeds=seeds, constraints=constraints
+            )
+            model_version = model.version
+
+        formatted_compositions = []
+        for composition_data in compositions:
+            formatted_composition = self._format_composition(composition_data, pack)
+            formatted_composition["model_version"] = model_version
+            formatted_compositions.append(formatted_composition)
+
+        return formatted_compositions
+
+    async def _generate_top_k(
+        self,
+        pack: str,
+        k: int,
+        num_candidates: int,
+        temperature: float = 1.0,
+        version: Optional[str] = None,
+        seed: Optional[int] = None,
+        constraints: Optional[SceneConstraints] = None
+    ) -> List[Dict]:
         """
-        logger.info(f"Generating rule-based composition for {pack}")
-
-        # 팩별 추천 소스 (수작업으로 큐레이션된 조합)
-        pack_sources = {
-            "adventure": {
-                "music": ["adv-hero", "adv-drums", "adv-flute", "adv-strings"],
-                "ambience": ["adv-birds", "adv-wind", "adv-grass"]
-            },
-            "combat": {
-                "music": ["cmb-warrior", "cmb-war_drums", "cmb-horn", "cmb-heavy_bass"],
-                "ambience": ["cmb-sword_clash", "cmb-fire", "cmb-thunder"]
-            },
-            "shelter": {
-                "music": ["shl-melody", "shl-piano", "shl-harp", "shl-pad"],
-                "ambience": ["shl-fireplace", "shl-rain", "shl-night"]
-            }
-        }
+        후보를 한 배치로 생성해 음악성 점수 상위 k개 반환 (추론 워커에서 실행)
 
-        sources = pack_sources.get(pack, pack_sources["adventure"])
-
-        # 16개 씬 생성
-        scenes = []
-        for scene_id in range(16):
-            placed_sources = []
-
-            # 각 씬에 2-4개 음악 소스 배치
-            num_music = np.random.randint(2, 5)
-            selected_music = np.random.choice(sources["music"], size=min(num_music, len(sources["music"])), replace=False)
-
-            for idx, source_id in enumerate(selected_music):
-                # 캔버스에 배치 (중앙 주변에 분산)
-                x = 500 + np.random.randn() * 150  # 중앙(500) 기준 분산
-                y = 300 + np.random.randn() * 100
-
-                # 범위 제한
-                x = max(50, min(950, x))
-                y = max(50, min(550, y))
-
-                placed_sources.append({
-                    "id": f"source_{scene_id}_{idx}",
-                    "sourceId": source_id,
-                    "x": float(x),
-                    "y": float(y),
-                    "volume": np.random.uniform(0.7, 1.0),
-                    "muted": False
-                })
+        Args:
+            pack: 팩 종류
+            k: 반환할 composition 개수
+            num_candidates: 디코딩할 후보 개수
+            temperature: 생성 다양성
+            version: 모델 버전 (None이면 기본 모델)
+            seed: 난수 시드
+            constraints: 생성 제약 (None이면 기본 제약)
 
-            scenes.append({
-                "id": scene_id,
-                "placedSources": placed_sources
-            })
+        Returns:
+            포맷 변환된 composition 리스트 (점수 내림차순)
+        """
+        if self.inference_mode == "process":
+            from api.services.workers import generate_top_k_in_worker
+
+            model_version, compositions = await self.executor.run(
+                generate_top_k_in_worker, pack, version, k, num_candidates, temperature, seed, constraints
+            )
+        else:
+            model = await self._get_model(pack, version)
+            compositions = await self.executor.run(
+                model.generate_top_k, k, num_candidates,
+                temperature=temperature, seed=seed, constraints=constraints
+            )
+            model_version = model.version
+
+        formatted_compositions = []
+        for composition_data in compositions:
+            formatted_composition = self._format_composition(composition_data, pack)
+            formatted_composition["model_version"] = model_version
+            formatted_compositions.append(formatted_composition)
 
-        # 모든 씬에 앰비언스 추가
-        for scene in scenes:
-            for idx, amb_source in enumerate(sources["ambience"]):
-                x = np.random.uniform(100, 900)
-                y = np.random.uniform(100, 500)
-
-                scene["placedSources"].append({
-                    "id": f"amb_{scene['id']}_{idx}",
-                    "sourceId": amb_source,
-                    "x": float(x),
-                    "y": float(y),
-                    "volume": np.random.uniform(0.5, 0.8),
-                    "muted": False
-                })
+        return formatted_compositions
 
-        return {
+    async def stream_composition(
+        self,
+        pack: Literal["adventure", "combat", "shelter"],
+        temperature: float = 1.0,
+        version: Optional[str] = None,
+        seed: Optional[int] = None
+    ) -> AsyncIterator[Tuple[str, Dict]]:
+        """
+        composition을 씬 단위로 생성하면서 바로 전달
+
+        Args:
+            pack: 팩 종류
+            temperature: 생성 다양성 (0.1~2.0)
+            version: 모델 버전 (None이면 기본 모델)
+            seed: 난수 시드 (generate_composition과 같은 결과, 결과 캐시 사용)
+
+        Yields:
+            ("scene", 씬) 16번, 마지막에 ("composition", 전체 composition 데이터)
+        """
+        composition = None
+        model = None
+
+        if version is None and seed is None:
+            pooled = self.pool.take(pack, temperature)
+            composition = pooled[0] if pooled else None
+
+        if composition is None:
+            model = await self._get_model(pack, version)
+
+            if model is None:
+                logger.warning(f"No model for {pack}, using rule-based generation")
+                composition = self._rule_based_generation(pack, seed)
+            elif seed is not None:
+                cache_key = self._cache_key(pack, version, model.version, temperature, seed)
+                composition = self.result_cache.get(cache_key)
+
+        # 이미 준비된 composition은 씬을 바로 전달
+        if composition is not None:
+            for scene in composition["scenes"]:
+                yield "scene", scene
+            yield "composition", composition
+            return
+
+        # 씬 하나씩 디코딩
+        scenes = model.generate_stream(temperature=temperature, seed=seed)
+
+        composition = {
             "pack": pack,
-            "scenes": scenes,
+            "scenes": [],
             "masterVolume": 1.0,
             "musicVolume": 1.0,
-            "ambienceVolume": 0.7,
-            "model_version": "rule-based-v1.0"
+            "ambienceVolume": 0.7
         }
+        while True:
+            scene = await self._run_local(next, scenes, None)
+            if scene is None:
+                break
+
+            composition["scenes"].append(scene)
+            yield "scene", scene
+
+        composition = self._format_composition(composition, pack)
+        composition["model_version"] = model.version
+        if seed is not None:
+            self.result_cache.put(self._cache_key(pack, version, model.version, temperature, seed), composition)
+
+        yield "composition", composition
+
+    async def _run_local(self, fn, *args, **kwargs):
+        """
+        이 프로세스에 로드된 모델로 추론 실행
+
+        process 모드의 워커에는 생성기 객체나 텐서 상태를 넘길 수 없으므로 메인 프로세스의 제한된 스레드 풀에서 실행
+        (thread 모드에서는 executor와 같은 풀)
+        """
+        return await self.local_executor.run(fn, *args, **kwargs)
+
+    async def remix_composition(
+        self,
+        composition: Dict,
+        composition_id: str,
+        temperature: float = 1.0,
+        version: Optional[str] = None,
+        seed: Optional[int] = None
+    ) -> Dict:
+        """
+        기존 composition을 인코딩한 메모리를 조건으로 새 composition 생성
+
+        Args:
+            composition: 원본 composition 데이터 ('pack', 'scenes')
+            composition_id: 원본 composition ID (인코더 출력 캐시 키)
+            temperature: 생성 다양성 (0.1~2.0)
+            version: 모델 버전 (None이면 기본 모델)
+            seed: 난수 시드 (같은 원본/시드/모델이면 같은 결과)
+
+        Returns:
+            생성된 composition 데이터
+
+        Raises:
+            RemixSourceError: 원본에 모델이 아는 소스가 없음
+        """
+        pack = composition["pack"]
+        model = await self._get_model(pack, version)
+
+        # 모델이 없으면 룰 기반 생성 (fallback)
+        if model is None:
+            logger.warning(f"No model for {pack}, using rule-based generation for remix")
+            return self._rule_based_generation(pack, seed)
+
+        # 인기 composition은 인코더를 다시 실행하지 않음
+        cache_key = (composition_id, version, model.version)
+        memory = self.memory_cache.get(cache_key)
+        if memory is None:
+            memory = await self._run_local(model.encode_memory, composition)
+            self.memory_cache.put(cache_key, memory)
+
+        compositions = await self._run_local(
+            model.generate_batch, 1, temperatures=[temperature], seeds=[seed], memory=memory
+        )
+
+        remixed = self._format_composition(compositions[0], pack)
+        remixed["model_version"] = model.version
+        return remixed
+
+    async def generate_compositions(
+        self,
+        pack: Literal["adventure", "combat", "shelter"],
+        count: int,
+        temperature: float = 1.0,
+        version: Optional[str] = None,
+        best_of: int = 1,
+        constraints: Optional[SceneConstraints] = None
+    ) -> List[Dict]:
+        """
+        여러 composition을 한 번의 배치 디코딩으로 생성
+
+        Args:
+            pack: 팩 종류
+            count: 생성할 composition 개수
+            temperature: 생성 다양성 (0.1~2.0)
+            version: 모델 버전 (None이면 기본 모델)
+            best_of: composition당 후보 개수 (1보다 크면 count * best_of개 후보 중 음악성 점수 상위 count개)
+            constraints: 씬 생성 제약 (None이면 기본 제약, 모델이 없으면 적용되지 않음)
+
+        Returns:
+            생성된 composition 데이터 리스트
+
+        Raises:
+            ConstraintError: 모델 소스로 만족할 수 없는 제약
+        """
+        try:
+            # 미리 생성해 둔 composition부터 사용하고 부족한 만큼만 생성 (제약 지정/best-of 요청 제외)
+            use_pool = version is None and best_of == 1 and constraints is None
+            pooled = self.pool.take(pack, temperature, count) if use_pool else []
+            if len(pooled) == count:
+                return pooled
+
+            model, model_version = await self._resolve_model(pack, version)
+
+            # 모델이 없으면 룰 기반 생성 (fallback)
+            if model_version is None:
+                logger.warning(f"No model for {pack}, using rule-based generation")
+                return pooled + self._rule_based_batch(pack, count - len(pooled))
+
+            if model is not None:
+                model.constraint_masks(constraints)
+
+            if best_of > 1:
+                return await self._generate_top_k(
+                    pack, count, count * best_of, temperature, version, constraints=constraints
+                )
+
+            # ML 모델로 배치 생성 (추론 워커에서 실행)
+            remaining = count - len(pooled)
+            return pooled + await self._generate_batch(
+                pack, [temperature] * remaining, version, constraints=[constraints] * remaining
+            )
+
+        except ConstraintError:
+            raise
+        except Exception as e:
+            logger.error(f"Batch generation failed: {e}, falling back to rule-based")
+            return self._rule_based_batch(pack, count)
+
+    def _rule_based_generation(self, pack: str, seed: Optional[int] = None) -> Dict:
+        """
+        룰 기반 composition 생성 (ML 모델이 없을 때 fallback)
+        음악 이론에 기반한 간단한 패턴 생성
+        """
+        return self._rule_based_batch(pack, 1, seed)[0]
+
+    def _rule_based_batch(self, pack: str, count: int, seed: Optional[int] = None) -> List[Dict]:
+        """
+        룰 기반 composition 여러 개를 한 번에 생성
+
+        모든 씬의 소스 개수/위치/볼륨을 요청별 난수 생성기에서 배열 단위로 뽑는다.
+
+        Args:
+            pack: 팩 종류
+            count: 생성할 composition 개수
+            seed: 난수 시드 (None이면 매번 다른 결과)
+
+        Returns:
+            생성된 composition 리스트
+        """
+        logger.info(f"Generating {count} rule-based compositions for {pack}")
+
+        sources = RULE_BASED_SOURCES.get(pack, RULE_BASED_SOURCES["adventure"])
+        music = np.array(sources["music"])
+        ambience = sources["ambience"]
+
+        rng = np.random.default_rng(seed)
+        shape = (count, 16)
+        num_slots = len(music)
+
+        # 각 씬에 2-4개 음악 소스 배치 (중복 없이, 무작위 순서)
+        num_music = np.minimum(rng.integers(2, 5, size=shape), num_slots)
+        music_order = np.argsort(rng.random(shape + (num_slots,)), axis=-1)
+
+        # 캔버스에 배치 (중앙 500, 300 주변에 분산, 범위 제한)
+        music_x = np.clip(500 + rng.standard_normal(shape + (num_slots,)) * 150, 50, 950)
+        music_y = np.clip(300 + rng.standard_normal(shape + (num_slots,)) * 100, 50, 550)
+        music_volume = rng.uniform(0.7, 1.0, size=shape + (num_slots,))
+
+        # 모든 씬에 앰비언스 추가
+        ambience_x = rng.uniform(100, 900, size=shape + (len(ambience),))
+        ambience_y = rng.uniform(100, 500, size=shape + (len(ambience),))
+        ambience_volume = rng.uniform(0.5, 0.8, size=shape + (len(ambience),))
+
+        # Python 값으로 한 번에 변환
+        num_music = num_music.tolist()
+        music_ids = music[music_order].tolist()
+        music_x, music_y, music_volume = music_x.tolist(), music_y.tolist(), music_volume.tolist()
+        ambience_x, ambience_y = ambience_x.tolist(), ambience_y.tolist()
+        ambience_volume = ambience_volume.tolist()
+
+        compositions = []
+        for n in range(count):
+            scenes = []
+            for scene_id in range(16):
+                placed_sources = [
+                    {
+                        "id": f"source_{scene_id}_{idx}",
+                        "sourceId": music_ids[n][scene_id][idx],
+                        "x": music_x[n][scene_id][idx],
+                        "y": music_y[n][scene_id][idx],
+                        "volume": music_volume[n][scene_id][idx],
+                        "muted": False
+                    }
+                    for idx in range(num_music[n][scene_id])
+                ]
+                placed_sources.extend(
+                    {
+                        "id": f"amb_{scene_id}_{idx}",
+                        "sourceId": amb_source,
+                        "x": ambience_x[n][scene_id][idx],
+                        "y": ambience_y[n][scene_id][idx],
+                        "volume": ambience_volume[n][scene_id][idx],
+                        "muted": False
+                    }
+                    for idx, amb_source in enumerate(ambience)
+                )
+
+                scenes.append({
+                    "id": scene_id,
+                    "placedSources": placed_sources
+                })
+
+            compositions.append({
+                "pack": pack,
+                "scenes": scenes,
+                "masterVolume": 1.0,
+                "musicVolume": 1.0,
+                "ambienceVolume": 0.7,
+                "model_version": "rule-based-v1.0"
+            })
+
+        return compositions
 
     def _format_composition(self, model_output: Dict, pack: str) -> Dict:
         """
@@ -167,25 +743,91 @@ class MLService:
         # 현재는 rule-based와 동일한 형식 반환
         return model_output
 
+    async def _worker_status(self) -> Optional[Dict]:
+        """
+        process 모드 워커들의 모델 레지스트리 상태 합계 (thread 모드나 ML 초기화 전이면 None)
+
+        fork 전에 로드한 고정 모델은 워커가 부모와 공유하므로 한 번만 세고, 그 뒤 워커나
+        메인 프로세스(stream/remix)에서 로드한 모델은 프로세스별 사본이므로 모두 더한다.
+        """
+        if self.inference_mode != "process" or self.executor is None:
+            return None
+
+        from api.services.workers import reset_worker_status, worker_status
+
+        async with self._worker_status_lock:
+            reset_worker_status()
+            reports = await asyncio.gather(
+                *[self.executor.run(worker_status) for _ in range(self.executor.max_workers)]
+            )
+
+        workers = list({report["pid"]: report for report in reports}.values())
+        parent = self.registry.resident()
+        shared_mb = sum(model["memory_mb"] for model in parent if model["pinned"])
+        private_mb = sum(
+            model["memory_mb"]
+            for resident in [parent] + [worker["resident"] for worker in workers]
+            for model in resident
+            if not model["pinned"]
+        )
+
+        return {
+            "processes": self.executor.max_workers,
+            "reported": len(workers),
+            "shared_mb": shared_mb,
+            "private_mb": private_mb,
+            "used_mb": shared_mb + private_mb,
+            "workers": workers
+        }
+
     async def get_model_status(self) -> Dict:
         """
         모델 상태 정보 반환
         """
+        torch_threads = None
+        if self.ml_ready.is_set():
+            import torch
+            torch_threads = torch.get_num_threads()
+
         status = {
-            "device": str(self.device),
+            "device": str(self.device) if self.device else None,
+            "ml": self.readiness(),
+            "inference_mode": self.inference_mode,
+            "torch_threads": torch_threads,
+            "executor": self.executor.stats() if self.executor else None,
+            "local_executor": (
+                self.local_executor.stats()
+                if self.local_executor is not None and self.local_executor is not self.executor else None
+            ),
+            "memory": self.registry.status(),
+            "worker_memory": await self._worker_status(),
+            "pool": self.pool.stats(),
+            "result_cache": self.result_cache.stats(),
+            "remix_memory_cache": self.memory_cache.stats(),
             "models": {}
         }
 
-        for pack in ["adventure", "combat", "shelter"]:
-            model = self.models.get(pack)
+        for pack in PACKS:
+            model = self.registry.get_resident(pack, touch=False)
             status["models"][pack] = {
+                "available": os.path.exists(self.registry.checkpoint_path(pack)),
                 "loaded": model is not None,
                 "version": model.version if model else None,
+                "backend": model.inference_ops.backend if model else None,
+                "quantization": model.quantization if model else None,
                 "parameters": sum(p.numel() for p in model.parameters()) if model else 0
             }
 
         return status
 
+    def shutdown(self):
+        """풀 채우기 및 추론 워커 종료"""
+        self.pool.stop()
+        if self.executor is not None:
+            self.executor.shutdown()
+        if self.local_executor is not None and self.local_executor is not self.executor:
+            self.local_executor.shutdown()
+
     async def trigger_training(self, pack: Optional[str] = None) -> str:
         """
         모델 학습 트리거
@@ -0,0 +1,215 @@
+"""
+팩/버전별 모델 지연 로딩 및 메모리 예산 기반 LRU 캐시
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from loguru import logger
+
+ModelKey = Tuple[str, Optional[str]]  # (pack, version) - version None은 기본 모델
+
+
+def model_memory_bytes(generator) -> int:
+    """
+    모델이 차지하는 메모리 (파라미터, 버퍼, 양자화된 packed 가중치 포함)
+
+    onnx 백엔드는 torch 가중치와 별도로 onnxruntime 세션이 가중치 사본을 가지므로 함께 센다.
+    """
+    def tensor_bytes(value: Any) -> int:
+        if hasattr(value, "element_size") and hasattr(value, "numel"):
+            return value.numel() * value.element_size()
+        if isinstance(value, (tuple, list)):
+            return sum(tensor_bytes(item) for item in value)
+        return 0
+
+    model_bytes = sum(tensor_bytes(value) for value in generator.model.state_dict().values())
+    ops_bytes = sum(
+        fn.memory_bytes() for fn in getattr(generator, "inference_ops", ()) if hasattr(fn, "memory_bytes")
+    )
+    return model_bytes + ops_bytes
+
+
+class ModelRegistry:
+    """
+    모델을 처음 사용할 때 로드하고, 전체 메모리가 예산을 넘으면 가장 오래 쓰지 않은 모델부터 내림
+
+    고정(pin)한 모델은 예산을 넘어도 내리지 않는다 (예: process 모드에서 fork 전에 공유하는 기본 모델).
+
+    체크포인트 파일:
+        - 기본 모델: {model_path}/{pack}_model.pth
+        - 버전 지정: {model_path}/{pack}_model_{version}.pth
+    """
+
+    def __init__(
+        self,
+        model_path: str,
+        load_fn: Callable[[str, str], Any],
+        budget_bytes: int = 0,
+        size_fn: Callable[[Any], int] = model_memory_bytes
+    ):
+        """
+        Args:
+            model_path: 체크포인트 디렉토리
+            load_fn: (pack, checkpoint 경로) → 생성기
+            budget_bytes: 상주 모델 메모리 예산 (0이면 무제한)
+            size_fn: 생성기 → 메모리 바이트
+        """
+        self.model_path = model_path
+        self.load_fn = load_fn
+        self.budget_bytes = budget_bytes
+        self.size_fn = size_fn
+
+        self._models: "OrderedDict[ModelKey, Dict]" = OrderedDict()
+        self._lock = threading.RLock()  # _models 접근용 (짧게 유지)
+        self._load_lock = threading.Lock()  # 같은 모델 중복 로드 방지
+        self.evictions = 0
+
+    def checkpoint_path(self, pack: str, version: Optional[str] = None) -> str:
+        """팩/버전의 체크포인트 경로"""
+        if version is not None and ("/" in version or os.sep in version):
+            raise ValueError(f"Invalid model version: {version}")
+
+        filename = f"{pack}_model.pth" if version is None else f"{pack}_model_{version}.pth"
+        return os.path.join(self.model_path, filename)
+
+    def get_resident(self, pack: str, version: Optional[str] = None, touch: bool = True):
+        """
+        이미 로드된 모델 (없으면 None, 로드하지 않음)
+
+        Args:
+            touch: True면 최근 사용으로 기록 (상태 조회 시에는 False)
+        """
+        with self._lock:
+            entry = self._models.get((pack, version))
+            if entry is None:
+                return None
+
+            if touch:
+                self._models.move_to_end((pack, version))
+                entry["last_used"] = time.time()
+            return entry["model"]
+
+    def get(self, pack: str, version: Optional[str] = None, pin: bool = False):
+        """
+        모델 가져오기 (처음 사용이면 로드, 블로킹)
+
+        Args:
+            pin: True면 예산을 넘어도 내리지 않도록 고정
+
+        Returns:
+            생성기 (체크포인트가 없거나 로드 실패 시 None)
+        """
+        model = self.get_resident(pack, version)
+        if model is not None:
+            if pin:
+                self._pin(pack, version)
+            return model
+
+        with self._load_lock:
+            # 대기하는 동안 다른 스레드가 로드했을 수 있음
+            model = self.get_resident(pack, version)
+            if model is not None:
+                if pin:
+                    self._pin(pack, version)
+                return model
+
+            path = self.checkpoint_path(pack, version)
+            if not os.path.exists(path):
+                logger.debug(f"No saved model found for {pack} (version: {version or 'default'})")
+                return None
+
+            try:
+                model = self.load_fn(pack, path)
+            except Exception as e:
+                logger.error(f"Failed to load model for {pack} (version: {version or 'default'}): {e}")
+                return None
+
+            size = self.size_fn(model)
+            with self._lock:
+                self._models[(pack, version)] = {
+                    "model": model,
+                    "bytes": size,
+                    "loaded_at": time.time(),
+                    "last_used": time.time(),
+                    "pinned": pin
+                }
+                logger.info(f"Loaded model for {pack} (version: {version or 'default'}, {size / (1 << 20):.1f} MB)")
+
+                self._evict(keep=(pack, version))
+
+            return model
+
+    def _pin(self, pack: str, version: Optional[str]):
+        """상주 중인 모델 고정"""
+        with self._lock:
+            entry = self._models.get((pack, version))
+            if entry is not None:
+                entry["pinned"] = True
+
+    def _evict(self, keep: ModelKey):
+        """예산을 넘으면 가장 오래 사용하지 않은 모델부터 제거 (방금 로드한 모델과 고정된 모델은 유지)"""
+        if self.budget_bytes <= 0:
+            return
+
+        while self.total_bytes() > self.budget_bytes:
+            victim = next(
+                (key for key, entry in self._models.items() if key != keep and not entry["pinned"]),
+                None
+            )
+            if victim is None:
+                logger.warning(
+                    f"Model {keep} and pinned models exceed the memory budget "
+                    f"({self.total_bytes() / (1 << 20):.1f} MB > {self.budget_bytes / (1 << 20):.1f} MB)"
+                )
+                return
+
+            del self._models[victim]
+            self.evictions += 1
+            logger.info(f"Evicted model {victim} to stay within memory budget")
+
+    def preload(self, packs: List[str], pin: bool = False):
+        """
+        여러 팩의 기본 모델을 미리 로드
+
+        Args:
+            pin: True면 예산을 넘어도 내리지 않도록 고정
+        """
+        for pack in packs:
+            self.get(pack, pin=pin)
+
+    def loaded_models(self) -> List:
+        """상주 중인 생성기 목록"""
+        with self._lock:
+            return [entry["model"] for entry in self._models.values()]
+
+    def total_bytes(self) -> int:
+        """상주 모델 메모리 합계"""
+        with self._lock:
+            return sum(entry["bytes"] for entry in self._models.values())
+
+    def resident(self) -> List[Dict]:
+        """상주 모델 목록 (오래 사용하지 않은 순)"""
+        with self._lock:
+            return [
+                {
+                    "pack": pack,
+                    "version": version or "default",
+                    "model_version": entry["model"].version,
+                    "memory_mb": entry["bytes"] / (1 << 20),
+                    "loaded_at": entry["loaded_at"],
+                    "last_used": entry["last_used"],
+                    "pinned": entry["pinned"]
+                }
+                for (pack, version), entry in self._models.items()
+            ]
+
+    def status(self) -> Dict:
+        """메모리 예산 및 상주 모델 상태"""
+        return {
+            "budget_mb": self.budget_bytes / (1 << 20) if self.budget_bytes > 0 else None,
+            "used_mb": self.total_bytes() / (1 << 20),
+            "evictions": self.evictions,
+            "resident": self.resident()
+        }
@@ -0,0 +1,148 @@
+"""
+팩/temperature별 미리 생성해 둔 composition 풀
+"""
+import asyncio
+from collections import deque
+from typing import Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+from loguru import logger
+
+PoolKey = Tuple[str, float]  # (pack, temperature 버킷)
+
+
+class CompositionPool:
+    """
+    팩/temperature 버킷별로 생성된 composition을 미리 채워 두고 요청 시 바로 꺼내 줌
+
+    추론 워커가 놀고 있을 때만 백그라운드에서 가장 많이 빈 풀부터 채운다.
+    한 번에 하나씩 생성하고 매번 워커가 노는지 다시 확인하므로, 사용자 요청이 들어오면
+    진행 중인 하나만 끝내고 양보한다 (요청보다 낮은 우선순위).
+    temperature는 소수 첫째 자리로 반올림한 값이 버킷과 같을 때만 풀에서 응답한다.
+    """
+
+    def __init__(
+        self,
+        produce: Callable[[str, float, int], Awaitable[List[Dict]]],
+        is_idle: Callable[[], bool],
+        packs: List[str],
+        temperatures: List[float],
+        capacity: int = 32,
+        idle_interval: float = 0.5,
+        retry_interval: float = 30.0
+    ):
+        """
+        Args:
+            produce: (pack, temperature, 개수) → 생성된 composition 리스트 (모델이 없으면 빈 리스트)
+            is_idle: 추론 워커가 놀고 있는지 (True일 때만 채움)
+            packs: 풀을 유지할 팩
+            temperatures: 풀을 유지할 temperature 버킷
+            capacity: 버킷별 최대 composition 수 (0이면 풀 비활성화)
+            idle_interval: 채울 것이 없거나 워커가 바쁠 때 다시 확인하는 간격 (초)
+            retry_interval: 생성에 실패한 버킷을 다시 시도하기까지의 간격 (초)
+        """
+        self.produce = produce
+        self.is_idle = is_idle
+        self.capacity = max(0, capacity)
+        self.idle_interval = idle_interval
+        self.retry_interval = retry_interval
+
+        self._pools: Dict[PoolKey, Deque[Dict]] = {
+            (pack, self._bucket(temperature)): deque()
+            for pack in packs
+            for temperature in temperatures
+        }
+        self._retry_at: Dict[PoolKey, float] = {}
+        self._task: Optional[asyncio.Task] = None
+
+        self.hits = 0
+        self.misses = 0
+        self.produced = 0
+
+    @staticmethod
+    def _bucket(temperature: float) -> float:
+        return round(temperature, 1)
+
+    @property
+    def enabled(self) -> bool:
+        return self.capacity > 0 and bool(self._pools)
+
+    def take(self, pack: str, temperature: float, count: int = 1) -> List[Dict]:
+        """
+        풀에서 composition을 최대 count개 꺼냄
+
+        Returns:
+            꺼낸 composition 리스트 (풀 대상이 아니거나 비었으면 빈 리스트)
+        """
+        pool = self._pools.get((pack, self._bucket(temperature)))
+        if pool is None or not self.enabled:
+            return []
+
+        taken = [pool.popleft() for _ in range(min(count, len(pool)))]
+        self.hits += len(taken)
+        self.misses += count - len(taken)
+
+        return taken
+
+    def start(self):
+        """백그라운드 채우기 시작 (이벤트 루프 안에서 호출)"""
+        if self.enabled and (self._task is None or self._task.done()):
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def stop(self):
+        """백그라운드 채우기 중지"""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def _next_key(self, now: float) -> Optional[PoolKey]:
+        """가장 많이 빈 버킷 (재시도 대기 중인 버킷 제외)"""
+        candidates = [
+            key for key, pool in self._pools.items()
+            if len(pool) < self.capacity and self._retry_at.get(key, 0.0) <= now
+        ]
+        if not candidates:
+            return None
+
+        return min(candidates, key=lambda key: len(self._pools[key]))
+
+    async def _run(self):
+        """채우기 루프"""
+        loop = asyncio.get_running_loop()
+
+        while True:
+            key = self._next_key(loop.time()) if self.is_idle() else None
+            if key is None:
+                await asyncio.sleep(self.idle_interval)
+                continue
+
+            pack, temperature = key
+
+            # 하나씩만 생성해 사용자 요청이 진행 중인 생성 하나 이상 기다리지 않게 함
+            try:
+                compositions = await self.produce(pack, temperature, 1)
+            except Exception as e:
+                logger.error(f"Failed to refill composition pool {key}: {e}")
+                compositions = []
+
+            if not compositions:
+                self._retry_at[key] = loop.time() + self.retry_interval
+                continue
+
+            added = compositions[:self.capacity - len(self._pools[key])]
+            self._pools[key].extend(added)
+            self.produced += len(added)
+
+            # 같은 이벤트 루프의 요청 처리에 양보 (다음 반복에서 워커가 노는지 다시 확인)
+            await asyncio.sleep(0)
+
+    def stats(self) -> Dict:
+        """풀 크기 및 hit rate"""
+        requests = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "capacity": self.capacity,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / requests if requests else 0.0,
+            "produced": self.produced,
+            "sizes": {f"{pack}@{temperature}": len(pool) for (pack, temperature), pool in self._pools.items()}
+        }
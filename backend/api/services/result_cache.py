@@ -0,0 +1,81 @@
+"""
+시드 생성 결과 캐시 (LRU + TTL)
+"""
+import copy
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+
+
+class ResultCache:
+    """
+    결정적으로 생성되는 결과를 키로 저장하는 LRU 캐시
+
+    항목은 ttl_seconds가 지나면 만료되고, max_size를 넘으면 가장 오래 사용하지 않은 항목부터 제거된다.
+    기본적으로 호출자가 결과를 수정해도 캐시가 바뀌지 않도록 저장/조회 시 복사본을 사용한다.
+    """
+
+    def __init__(self, max_size: int = 1024, ttl_seconds: float = 3600.0, copy_values: bool = True):
+        """
+        Args:
+            max_size: 최대 항목 수 (0이면 캐시 비활성화)
+            ttl_seconds: 항목 유효 시간 (0이면 만료 없음)
+            copy_values: 저장/조회 시 deepcopy 여부 (읽기 전용 텐서 등은 False)
+        """
+        self.max_size = max(0, max_size)
+        self.ttl_seconds = ttl_seconds
+        self.copy_values = copy_values
+
+        self._items: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """캐시된 값 (없거나 만료되면 None)"""
+        if self.max_size == 0:
+            return None
+
+        with self._lock:
+            item = self._items.get(key)
+            if item is not None and self.ttl_seconds > 0 and time.time() - item[0] > self.ttl_seconds:
+                del self._items[key]
+                item = None
+
+            if item is None:
+                self.misses += 1
+                return None
+
+            self._items.move_to_end(key)
+            self.hits += 1
+            value = item[1]
+
+        return copy.deepcopy(value) if self.copy_values else value
+
+    def put(self, key: Hashable, value: Any):
+        """값 저장 (가득 차면 가장 오래 사용하지 않은 항목 제거)"""
+        if self.max_size == 0:
+            return
+
+        if self.copy_values:
+            value = copy.deepcopy(value)
+
+        with self._lock:
+            self._items[key] = (time.time(), value)
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+
+    def stats(self) -> Dict:
+        """크기 및 hit rate"""
+        with self._lock:
+            requests = self.hits + self.misses
+            return {
+                "size": len(self._items),
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / requests if requests else 0.0
+            }
@@ -0,0 +1,160 @@
+"""
+멀티코어 생성을 위한 추론 워커 프로세스
+"""
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+import torch
+
+from api.services.model_registry import ModelRegistry
+from models.transformer.constraints import SceneConstraints
+
+# 상태 조회 시 다른 워커를 기다리는 최대 시간 (초)
+STATUS_BARRIER_TIMEOUT = 0.5
+
+# 워커 프로세스의 모델 레지스트리 (fork로 부모 프로세스에서 상속)
+_worker_registry: Optional[ModelRegistry] = None
+
+# 상태 조회 작업이 워커마다 하나씩 돌아가도록 맞추는 barrier (부모와 워커가 공유)
+_status_barrier = None
+
+
+def _init_worker(registry: ModelRegistry, torch_threads: int, status_barrier):
+    """워커 프로세스 초기화"""
+    global _worker_registry, _status_barrier
+    _worker_registry = registry
+    _status_barrier = status_barrier
+    torch.set_num_threads(torch_threads)
+
+
+def _noop():
+    """워커 프로세스를 미리 띄우기 위한 빈 작업"""
+    return None
+
+
+def _get_worker_model(pack: str, version: Optional[str]):
+    """워커 프로세스의 모델 (체크포인트가 없으면 예외)"""
+    model = _worker_registry.get(pack, version)
+    if model is None:
+        raise RuntimeError(f"No model for {pack} (version: {version or 'default'})")
+    return model
+
+
+def generate_in_worker(
+    pack: str,
+    version: Optional[str],
+    temperatures: List[float],
+    seeds: Optional[List[Optional[int]]] = None,
+    constraints: Optional[List[Optional[SceneConstraints]]] = None
+) -> Tuple[str, List[Dict]]:
+    """
+    워커 프로세스에서 composition 배치 생성
+
+    Args:
+        pack: 팩 종류
+        version: 모델 버전 (None이면 기본 모델)
+        temperatures: composition별 temperature
+        seeds: composition별 난수 시드 (None이면 모두 무작위)
+        constraints: composition별 생성 제약 (None이면 기본 제약)
+
+    Returns:
+        (모델 버전, 생성된 composition 리스트 (포맷 변환 전))
+    """
+    model = _get_worker_model(pack, version)
+    compositions = model.generate_batch(
+        len(temperatures), temperatures=temperatures, seeds=seeds, constraints=constraints
+    )
+    return model.version, compositions
+
+
+def generate_top_k_in_worker(
+    pack: str,
+    version: Optional[str],
+    k: int,
+    num_candidates: int,
+    temperature: float,
+    seed: Optional[int] = None,
+    constraints: Optional[SceneConstraints] = None
+) -> Tuple[str, List[Dict]]:
+    """
+    워커 프로세스에서 후보를 생성해 음악성 점수 상위 k개 반환
+
+    Args:
+        pack: 팩 종류
+        version: 모델 버전 (None이면 기본 모델)
+        k: 반환할 composition 개수
+        num_candidates: 디코딩할 후보 개수
+        temperature: 생성 다양성
+        seed: 난수 시드
+        constraints: 생성 제약 (None이면 기본 제약)
+
+    Returns:
+        (모델 버전, 생성된 composition 리스트 (포맷 변환 전, 점수 내림차순))
+    """
+    model = _get_worker_model(pack, version)
+    return model.version, model.generate_top_k(
+        k, num_candidates, temperature=temperature, seed=seed, constraints=constraints
+    )
+
+
+def worker_status() -> Dict:
+    """
+    워커 프로세스의 모델 레지스트리 상태
+
+    워커 수만큼 제출하면 모든 워커가 barrier에서 만나므로 워커마다 하나씩 실행된다.
+    긴 추론 중인 워커가 있으면 STATUS_BARRIER_TIMEOUT 뒤 기다리지 않고 응답한다
+    (한 워커가 여러 번 응답할 수 있으므로 호출 측에서 pid로 중복 제거).
+
+    Returns:
+        {'pid', 'budget_mb', 'used_mb', 'evictions', 'resident'}
+    """
+    try:
+        _status_barrier.wait(STATUS_BARRIER_TIMEOUT)
+    except threading.BrokenBarrierError:
+        pass
+
+    return {"pid": os.getpid(), **_worker_registry.status()}
+
+
+def reset_worker_status():
+    """이전 조회에서 깨진 상태 조회 barrier 초기화 (부모 프로세스, 조회 시작 전에 호출)"""
+    _status_barrier.reset()
+
+
+def create_worker_pool(registry: ModelRegistry, num_processes: int, torch_threads: int = 1) -> ProcessPoolExecutor:
+    """
+    모델을 공유하는 추론 워커 프로세스 풀 생성
+
+    fork 전에 상주 중인 모델 가중치를 공유 메모리로 옮기므로, 워커 N개가 가중치 사본 N개를 갖지 않고
+    같은 페이지를 공유한다. fork 이후 워커에서 처음 로드되는 모델은 워커별로 로드된다.
+    요청은 풀의 작업 큐로 워커에 분배된다.
+
+    Args:
+        registry: 모델 레지스트리 (공유할 모델은 미리 로드해 둘 것)
+        num_processes: 워커 프로세스 수
+        torch_threads: 워커당 torch intra-op 스레드 수
+
+    Returns:
+        ProcessPoolExecutor
+    """
+    global _status_barrier
+
+    for generator in registry.loaded_models():
+        generator.model.share_memory()
+
+    context = multiprocessing.get_context("fork")
+    _status_barrier = context.Barrier(num_processes)
+
+    pool = ProcessPoolExecutor(
+        max_workers=num_processes,
+        mp_context=context,
+        initializer=_init_worker,
+        initargs=(registry, torch_threads, _status_barrier)
+    )
+
+    # 다른 스레드가 생기기 전에 바로 fork (fork 컨텍스트는 첫 작업 때 워커를 모두 띄움)
+    pool.submit(_noop).result()
+
+    return pool
@@ -0,0 +1,92 @@
+"""
+API 기동 시간 벤치마크 (api.main import 시간 및 무거운 모듈 import 여부)
+
+새 프로세스에서 api.main을 import해 측정하므로 이미 로드된 모듈의 영향을 받지 않는다.
+torch/sklearn 등이 import 경로에 다시 들어오거나 기준 시간을 넘으면 종료 코드 1을 반환한다.
+
+예:
+    python -m benchmarks.import_time --runs 5 --max-ms 1500
+"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+from typing import Dict, List
+
+# api.main import 시점에 로드되면 안 되는 모듈 (ML 초기화 시점에 import)
+HEAVY_MODULES = ["torch", "sklearn", "models.transformer.composition_generator"]
+
+_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import api.main
+elapsed = time.perf_counter() - start
+print(json.dumps({{"import_ms": elapsed * 1000, "loaded": [m for m in {modules!r} if m in sys.modules]}}))
+"""
+
+
+def measure_import(modules: List[str] = HEAVY_MODULES) -> Dict:
+    """
+    새 인터프리터에서 api.main import 시간 측정
+
+    Returns:
+        {"import_ms": import 시간, "loaded": import된 무거운 모듈 목록}
+    """
+    backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ, PYTHONPATH=backend_dir, LOGURU_LEVEL="WARNING")
+
+    result = subprocess.run(
+        [sys.executable, "-c", _PROBE.format(modules=modules)],
+        cwd=backend_dir,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def run_benchmark(runs: int = 5) -> Dict:
+    """
+    api.main import를 여러 번 측정 (첫 실행은 디스크 캐시 워밍업으로 제외)
+
+    Returns:
+        import 시간 통계 및 import된 무거운 모듈 목록
+    """
+    measure_import()
+
+    results = [measure_import() for _ in range(runs)]
+    times = [result["import_ms"] for result in results]
+
+    return {
+        "runs": runs,
+        "import_ms_min": min(times),
+        "import_ms_median": statistics.median(times),
+        "import_ms_max": max(times),
+        "heavy_modules_loaded": sorted({module for result in results for module in result["loaded"]})
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--max-ms", type=float, default=1500, help="import 시간 중앙값 기준 (ms)")
+
+    args = parser.parse_args()
+
+    report = run_benchmark(args.runs)
+    print(json.dumps(report, indent=2))
+
+    failures = []
+    if report["heavy_modules_loaded"]:
+        failures.append(f"heavy modules imported by api.main: {', '.join(report['heavy_modules_loaded'])}")
+    if report["import_ms_median"] > args.max_ms:
+        failures.append(f"api.main import took {report['import_ms_median']:.0f} ms (> {args.max_ms:.0f} ms)")
+
+    for failure in failures:
+        print(f"FAIL: {failure}", file=sys.stderr)
+
+    sys.exit(1 if failures else 0)
@@ -0,0 +1,231 @@
+"""
+CompositionTransformer 디코딩 연산 컴파일 (TorchScript / torch.compile)
+
+작은 모델(hidden 256)에서는 레이어마다의 Python 디스패치 비용이 지연 시간의 큰 비중을 차지하므로,
+증분 디코딩 루프의 토큰 특징, 디코더 스텝, 출력 헤드를 컴파일된 그래프로 교체한다.
+"""
+import os
+from typing import Optional, Tuple
+import torch
+import torch.nn as nn
+from loguru import logger
+
+from models.transformer.composition_generator import CompositionTransformer, InferenceOps
+
+PARITY_ATOL = 1e-4
+
+
+class _TokenFeatures(nn.Module):
+    def __init__(self, model: CompositionTransformer):
+        super().__init__()
+        self.model = model
+
+    def forward(self, tokens: torch.Tensor) -> torch.Tensor:
+        return self.model.token_features(tokens)
+
+
+class _DecoderStep(nn.Module):
+    def __init__(self, model: CompositionTransformer):
+        super().__init__()
+        self.model = model
+
+    def forward(
+        self,
+        features: torch.Tensor,
+        self_k: torch.Tensor,
+        self_v: torch.Tensor,
+        mem_k: torch.Tensor,
+        mem_v: torch.Tensor
+    ) -> Tuple[torch.Tensor, torch.Tensor, torch.Tensor]:
+        return self.model.decode_step(features, self_k, self_v, mem_k, mem_v)
+
+
+class _DecoderInit(nn.Module):
+    """memory에 대한 cross-attention key/value (self-attention 캐시는 길이 0이므로 제외)"""
+
+    def __init__(self, model: CompositionTransformer):
+        super().__init__()
+        self.model = model
+
+    def forward(self, memory: torch.Tensor) -> Tuple[torch.Tensor, torch.Tensor]:
+        _, _, mem_k, mem_v = self.model.init_decoder_cache(memory)
+        return mem_k, mem_v
+
+
+class _Heads(nn.Module):
+    def __init__(self, model: CompositionTransformer):
+        super().__init__()
+        self.model = model
+
+    def forward(self, output: torch.Tensor) -> Tuple[torch.Tensor, torch.Tensor, torch.Tensor]:
+        return self.model.predict_heads(output)
+
+
+def _example_memory(model: CompositionTransformer, batch_size: int = 2) -> torch.Tensor:
+    """trace/parity 검사용 고정 시드 디코더 메모리"""
+    device = next(model.parameters()).device
+    generator = torch.Generator().manual_seed(0)
+    return torch.randn(batch_size, 1, model.hidden_dim, generator=generator).to(device)
+
+
+def _example_inputs(model: CompositionTransformer, batch_size: int = 2, prefix_len: int = 2):
+    """trace/parity 검사용 고정 시드 입력"""
+    device = next(model.parameters()).device
+    generator = torch.Generator().manual_seed(0)
+
+    memory = torch.randn(batch_size, 1, model.hidden_dim, generator=generator).to(device)
+    tokens = torch.randint(0, model.num_sources, (batch_size, prefix_len), generator=generator).to(device)
+
+    self_k, self_v, mem_k, mem_v = model.init_decoder_cache(memory)
+    for step in range(prefix_len - 1):
+        _, self_k, self_v = model.decode_step(
+            model.token_features(tokens[:, step:step + 1]), self_k, self_v, mem_k, mem_v
+        )
+
+    features = model.token_features(tokens[:, -1:])
+    return tokens, features, (self_k, self_v, mem_k, mem_v)
+
+
+def _trace(model: CompositionTransformer, cache_prefix: Optional[str]) -> InferenceOps:
+    """TorchScript trace (캐시가 있으면 로드)"""
+    device = next(model.parameters()).device
+    names = ("token_features", "decode_step", "predict_heads")
+    cache_paths = [f"{cache_prefix}_{name}.pt" for name in names] if cache_prefix else []
+
+    if cache_paths and all(os.path.exists(path) for path in cache_paths):
+        logger.info(f"Loading TorchScript decoding ops from cache: {cache_prefix}")
+        return InferenceOps(*[torch.jit.load(path, map_location=device) for path in cache_paths], "script")
+
+    with torch.no_grad():
+        tokens, features, cache = _example_inputs(model)
+        output, _, _ = model.decode_step(features, *cache)
+
+        traced = [
+            torch.jit.trace(_TokenFeatures(model), (tokens,), check_trace=False),
+            torch.jit.trace(_DecoderStep(model), (features, *cache), check_trace=False),
+            torch.jit.trace(_Heads(model), (output[:, -1, :],), check_trace=False)
+        ]
+
+    if cache_paths:
+        os.makedirs(os.path.dirname(cache_prefix), exist_ok=True)
+        for module, path in zip(traced, cache_paths):
+            torch.jit.save(module, path)
+        logger.info(f"Saved TorchScript decoding ops to cache: {cache_prefix}")
+
+    return InferenceOps(*traced, "script")
+
+
+def _compile(model: CompositionTransformer, cache_dir: Optional[str]) -> InferenceOps:
+    """torch.compile (inductor 캐시 디렉토리 지정 후 시작 시점에 워밍업)"""
+    if cache_dir:
+        os.environ.setdefault("TORCHINDUCTOR_CACHE_DIR", os.path.join(cache_dir, "inductor"))
+
+    ops = InferenceOps(
+        torch.compile(model.token_features, dynamic=True),
+        torch.compile(model.decode_step, dynamic=True),
+        torch.compile(model.predict_heads, dynamic=True),
+        "compile"
+    )
+
+    # 첫 요청이 아닌 로드 시점에 컴파일
+    with torch.no_grad():
+        tokens, features, cache = _example_inputs(model)
+        ops.token_features(tokens)
+        output, _, _ = ops.decode_step(features, *cache)
+        ops.predict_heads(output[:, -1, :])
+
+    return ops
+
+
+def check_parity(model: CompositionTransformer, ops: InferenceOps, atol: float = PARITY_ATOL) -> float:
+    """
+    고정 시드 입력에 대해 컴파일된 연산과 eager 출력 비교
+
+    Returns:
+        최대 절대 오차 (atol 초과 시 ValueError)
+    """
+    eager = model.eager_ops()
+
+    with torch.no_grad():
+        # trace 시 사용한 것과 다른 배치/길이로 검사
+        tokens, features, cache = _example_inputs(model, batch_size=3, prefix_len=4)
+
+        pairs = [(eager.token_features(tokens), ops.token_features(tokens))]
+
+        expected = eager.decode_step(features, *cache)
+        actual = ops.decode_step(features, *cache)
+        pairs.extend(zip(expected, actual))
+
+        pairs.extend(zip(eager.predict_heads(expected[0][:, -1, :]), ops.predict_heads(expected[0][:, -1, :])))
+
+        if ops.init_decoder_cache is not None:
+            memory = _example_memory(model, batch_size=3)
+            # self-attention 캐시는 길이 0이므로 memory key/value만 비교
+            pairs.extend(zip(model.init_decoder_cache(memory)[2:], ops.init_decoder_cache(memory)[2:]))
+
+    max_error = max((a - b).abs().max().item() for a, b in pairs)
+    if max_error > atol:
+        raise ValueError(f"{ops.backend} ops differ from eager (max error {max_error:.2e})")
+
+    return max_error
+
+
+def build_inference_ops(
+    model: CompositionTransformer,
+    backend: str,
+    cache_dir: Optional[str] = None,
+    cache_key: str = "default",
+    quantization: Optional[str] = None
+) -> InferenceOps:
+    """
+    컴파일된 디코딩 연산 생성 (실패 시 eager로 fallback)
+
+    Args:
+        model: 가중치가 로드된 모델 (eval 모드로 전환됨)
+        backend: "script", "compile" 또는 "onnx" (onnxruntime CPU)
+        cache_dir: 컴파일 결과 캐시 디렉토리
+        cache_key: 캐시 키 (체크포인트 해시 등)
+        quantization: 모델 양자화 모드 (양자화된 모델은 ONNX export를 시도하지 않음)
+
+    Returns:
+        InferenceOps
+    """
+    model.eval()
+
+    # 동적 양자화 연산(quantized::linear_dynamic)은 ONNX로 export되지 않음
+    if backend == "onnx" and quantization is not None:
+        logger.warning(f"ONNX backend does not support {quantization} models, using eager decoding ops")
+        return model.eager_ops()
+
+    try:
+        if backend == "script":
+            cache_prefix = None
+            if cache_dir:
+                cache_prefix = os.path.join(cache_dir, f"{cache_key}_torch{torch.__version__}")
+            ops = _trace(model, cache_prefix)
+        elif backend == "compile":
+            ops = _compile(model, cache_dir)
+        elif backend == "onnx":
+            from models.transformer.onnx_backend import build_onnx_ops
+
+            cache_prefix = None
+            if cache_dir:
+                cache_prefix = os.path.join(cache_dir, f"{cache_key}_onnx_torch{torch.__version__}")
+            ops = build_onnx_ops(model, cache_prefix)
+        else:
+            raise ValueError(f"Unknown inference backend: {backend}")
+
+        max_error = check_parity(model, ops)
+        logger.info(f"Using {backend} decoding ops (parity max error {max_error:.2e})")
+
+        if backend == "onnx":
+            from models.transformer.onnx_backend import release_torch_decoder
+
+            # onnxruntime이 디코더/출력 헤드 가중치를 가지므로 torch 사본은 해제
+            release_torch_decoder(model)
+
+        return ops
+
+    except Exception as e:
+        logger.error(f"Failed to build {backend} decoding ops: {e}, falling back to eager")
+        return model.eager_ops()
@@ -4,9 +4,19 @@ Transformer 기반 Composition 생성 모델
 import torch
 import torch.nn as nn
 import torch.nn.functional as F
-from typing import Dict, List, Optional
+from typing import Callable, Dict, Iterator, List, NamedTuple, Optional, Tuple
+import hashlib
+import math
+import os
+import threading
+from collections import OrderedDict
 import numpy as np
 
+from models.transformer.constraints import ConstraintError, RemixSourceError, SceneConstraints
+from training.evaluation.metrics import CompositionMetrics
+
+# 생성기별로 보관하는 제약 마스크 수 (제약은 요청 파라미터로 만들어지므로 LRU로 제한)
+CONSTRAINT_CACHE_SIZE = 128
 
 class SourceEmbedding(nn.Module):
     """소스 ID를 임베딩으로 변환"""
@@ -49,6 +59,34 @@ class PositionEncoder(nn.Module):
         return self.position_encoder(positions)
 
 
+class InferenceOps(NamedTuple):
+    """
+    증분 디코딩 루프가 사용하는 연산 묶음
+
+    기본은 모델의 eager 메서드이며, 컴파일된 백엔드(TorchScript, torch.compile 등)로 교체할 수 있다.
+    init_decoder_cache가 None이면 모델의 init_decoder_cache()를 사용한다.
+    """
+    token_features: Callable
+    decode_step: Callable
+    predict_heads: Callable
+    backend: str = "eager"
+    init_decoder_cache: Optional[Callable] = None
+
+
+def _split_heads(x: torch.Tensor, num_heads: int) -> torch.Tensor:
+    """(batch, seq, hidden) -> (batch, heads, seq, head_dim)"""
+    batch_size, seq_len, hidden_dim = x.shape
+    return x.view(batch_size, seq_len, num_heads, hidden_dim // num_heads).transpose(1, 2)
+
+
+def _attend(q: torch.Tensor, k: torch.Tensor, v: torch.Tensor) -> torch.Tensor:
+    """Scaled dot-product attention 후 head 병합: (batch, seq, hidden)"""
+    scores = torch.matmul(q, k.transpose(-2, -1)) / math.sqrt(q.shape[-1])
+    out = torch.matmul(F.softmax(scores, dim=-1), v)
+    batch_size, num_heads, seq_len, head_dim = out.shape
+    return out.transpose(1, 2).reshape(batch_size, seq_len, num_heads * head_dim)
+
+
 class CompositionTransformer(nn.Module):
     """
     Composition을 생성하는 Transformer 모델
@@ -66,14 +104,23 @@ class CompositionTransformer(nn.Module):
         num_heads: int = 8,
         num_layers: int = 6,
         dropout: float = 0.1,
-        max_sources_per_scene: int = 20
+        max_sources_per_scene: int = 20,
+        num_decoder_layers: Optional[int] = None
     ):
+        """
+        Args:
+            num_layers: 인코더 레이어 수 (num_decoder_layers가 None이면 디코더도 같은 수)
+            num_decoder_layers: 디코더 레이어 수 (distillation student는 더 적게 사용)
+        """
         super().__init__()
 
         self.num_sources = num_sources
         self.embedding_dim = embedding_dim
         self.position_dim = position_dim
         self.hidden_dim = hidden_dim
+        self.num_heads = num_heads
+        self.num_layers = num_layers
+        self.num_decoder_layers = num_layers if num_decoder_layers is None else num_decoder_layers
         self.max_sources_per_scene = max_sources_per_scene
 
         # 임베딩 레이어
@@ -102,7 +149,7 @@ class CompositionTransformer(nn.Module):
             dropout=dropout,
             batch_first=True
         )
-        self.transformer_decoder = nn.TransformerDecoder(decoder_layer, num_layers=num_layers)
+        self.transformer_decoder = nn.TransformerDecoder(decoder_layer, num_layers=self.num_decoder_layers)
 
         # 출력 헤드
         self.source_head = nn.Linear(hidden_dim, num_sources)  # 소스 ID 예측
@@ -113,7 +160,23 @@ class CompositionTransformer(nn.Module):
         self.pad_token = num_sources
         self.start_token = num_sources - 1
 
-    def encode_composition(self, composition_data: Dict) -> torch.Tensor:
+        # 디코더 입력 토큰별 특징 테이블 (추론 시 token_features를 조회로 대체, state_dict에는 저장하지 않음)
+        # 가중치를 바꾸는 곳에서 invalidate_token_features()로 비우고 다음 조회 때 다시 계산
+        self.register_buffer("_token_feature_table", None, persistent=False)
+
+    def config(self) -> Dict:
+        """모델 구조 설정 (체크포인트에 저장해 같은 구조로 다시 생성)"""
+        return {
+            'embedding_dim': self.embedding_dim,
+            'position_dim': self.position_dim,
+            'hidden_dim': self.hidden_dim,
+            'num_heads': self.num_heads,
+            'num_layers': self.num_layers,
+            'num_decoder_layers': self.num_decoder_layers,
+            'max_sources_per_scene': self.max_sources_per_scene
+        }
+
+    def encode_composition(self, composition_data: Dict, padding_mask: Optional[torch.Tensor] = None) -> torch.Tensor:
         """
         Composition 데이터를 인코딩
 
@@ -123,6 +186,7 @@ class CompositionTransformer(nn.Module):
                 'positions': (batch, num_scenes, max_sources, 2),
                 'volumes': (batch, num_scenes, max_sources)
             }
+            padding_mask: (batch, num_scenes * max_sources) - True인 위치(패딩)는 attention에서 제외
 
         Returns:
             encoded: (batch, num_scenes * max_sources, hidden_dim)
@@ -143,89 +207,417 @@ class CompositionTransformer(nn.Module):
         features = torch.cat([source_emb, position_emb, volumes], dim=-1)
         features = self.feature_projection(features)
 
+        # 소스가 하나도 없는 행은 전부 마스킹되면 attention이 NaN이 되므로 첫 위치는 남김
+        if padding_mask is not None:
+            empty = padding_mask.all(dim=1)
+            if empty.any():
+                padding_mask = padding_mask.clone()
+                padding_mask[empty, 0] = False
+
         # Transformer 인코딩
-        encoded = self.transformer_encoder(features)
+        encoded = self.transformer_encoder(features, src_key_padding_mask=padding_mask)
 
         return encoded
 
-    def generate_scene(
+    def token_features(self, tokens: torch.Tensor) -> torch.Tensor:
+        """
+        디코더 입력 토큰의 특징 벡터 (위치 0, 볼륨 1로 고정)
+
+        토큰마다 특징이 상수이므로 gradient가 필요 없으면 미리 계산한 테이블에서 조회한다.
+
+        Args:
+            tokens: (batch, seq_len) - 소스 ID 시퀀스
+
+        Returns:
+            features: (batch, seq_len, hidden_dim)
+        """
+        if torch.is_grad_enabled():
+            return self._project_tokens(tokens)
+
+        return F.embedding(tokens, self.token_feature_table())
+
+    def _project_tokens(self, tokens: torch.Tensor) -> torch.Tensor:
+        """토큰 임베딩 + 고정 위치/볼륨 특징을 hidden_dim으로 투영"""
+        token_emb = self.source_embedding(tokens)
+        dummy_pos = torch.zeros(*tokens.shape, 2, device=tokens.device)
+        dummy_vol = torch.ones(*tokens.shape, 1, device=tokens.device)
+
+        pos_emb = self.position_encoder(dummy_pos)
+        features = torch.cat([token_emb, pos_emb, dummy_vol], dim=-1)
+        return self.feature_projection(features)
+
+    def token_feature_table(self) -> torch.Tensor:
+        """
+        (num_sources + 1, hidden_dim) 토큰별 투영 특징 테이블
+
+        비어 있을 때만 계산한다. 버퍼이므로 디바이스 이동은 따라가고, 가중치가 바뀌면
+        (load_state_dict, 학습 모드 전환, 옵티마이저 스텝, 양자화) invalidate_token_features()로 비운다.
+        """
+        table = self._token_feature_table
+        if table is None:
+            weight = self.source_embedding.embedding.weight
+            with torch.no_grad():
+                tokens = torch.arange(self.num_sources + 1, device=weight.device).unsqueeze(0)
+                table = self._project_tokens(tokens).squeeze(0)
+            self._token_feature_table = table
+
+        return table
+
+    def invalidate_token_features(self):
+        """토큰 특징 테이블 비우기 (가중치를 바꾼 뒤 호출, 다음 조회 때 다시 계산)"""
+        self._token_feature_table = None
+
+    def train(self, mode: bool = True) -> "CompositionTransformer":
+        """학습 모드에 들어가거나 나올 때 토큰 특징 테이블 비우기 (학습 중 가중치가 바뀜)"""
+        if mode or self.training:
+            self.invalidate_token_features()
+        return super().train(mode)
+
+    def load_state_dict(self, state_dict, strict: bool = True, assign: bool = False):
+        """가중치 로드 후 토큰 특징 테이블 비우기"""
+        result = super().load_state_dict(state_dict, strict=strict, assign=assign)
+        self.invalidate_token_features()
+        return result
+
+    def decode_full(self, tokens: torch.Tensor, memory: torch.Tensor) -> torch.Tensor:
+        """
+        토큰 prefix 전체를 매 스텝 다시 계산하는 디코딩 (causal mask 적용)
+
+        Args:
+            tokens: (batch, seq_len) - 지금까지의 토큰
+            memory: (batch, mem_len, hidden_dim)
+
+        Returns:
+            output: (batch, seq_len, hidden_dim)
+        """
+        seq_len = tokens.shape[1]
+        causal_mask = torch.triu(
+            torch.full((seq_len, seq_len), float('-inf'), device=tokens.device),
+            diagonal=1
+        )
+        return self.transformer_decoder(self.token_features(tokens), memory, tgt_mask=causal_mask)
+
+    def init_decoder_cache(self, memory: torch.Tensor) -> Tuple[torch.Tensor, ...]:
+        """
+        증분 디코딩용 KV 캐시 초기화
+
+        memory에 대한 cross-attention key/value는 스텝마다 동일하므로 한 번만 계산한다.
+
+        Args:
+            memory: (batch, mem_len, hidden_dim)
+
+        Returns:
+            (self_k, self_v, mem_k, mem_v) - 각각 (num_layers, batch, heads, len, head_dim)
+            self_k/self_v는 길이 0으로 시작
+        """
+        mem_k, mem_v = [], []
+        for layer in self.transformer_decoder.layers:
+            attn = layer.multihead_attn
+            _, w_k, w_v = attn.in_proj_weight.chunk(3)
+            _, b_k, b_v = attn.in_proj_bias.chunk(3)
+            mem_k.append(_split_heads(F.linear(memory, w_k, b_k), attn.num_heads))
+            mem_v.append(_split_heads(F.linear(memory, w_v, b_v), attn.num_heads))
+
+        mem_k = torch.stack(mem_k)
+        mem_v = torch.stack(mem_v)
+        empty = mem_k.new_zeros(*mem_k.shape[:3], 0, mem_k.shape[-1])
+
+        return empty, empty.clone(), mem_k, mem_v
+
+    def decode_step(
+        self,
+        features: torch.Tensor,
+        self_k: torch.Tensor,
+        self_v: torch.Tensor,
+        mem_k: torch.Tensor,
+        mem_v: torch.Tensor
+    ) -> Tuple[torch.Tensor, torch.Tensor, torch.Tensor]:
+        """
+        새 토큰 하나만 디코더에 통과시키는 증분 디코딩 스텝
+
+        Args:
+            features: (batch, 1, hidden_dim) - 새 토큰 특징
+            self_k, self_v: (num_layers, batch, heads, seq_len, head_dim) - 이전 토큰 캐시
+            mem_k, mem_v: init_decoder_cache()의 memory 캐시
+
+        Returns:
+            (output, self_k, self_v) - output: (batch, 1, hidden_dim), 캐시는 seq_len + 1
+        """
+        x = features
+        new_k, new_v = [], []
+
+        for idx, layer in enumerate(self.transformer_decoder.layers):
+            # Self-attention: 새 토큰의 key/value만 계산해 캐시에 이어붙임
+            attn = layer.self_attn
+            h = layer.norm1(x) if layer.norm_first else x
+            q, k, v = F.linear(h, attn.in_proj_weight, attn.in_proj_bias).chunk(3, dim=-1)
+            k = torch.cat([self_k[idx], _split_heads(k, attn.num_heads)], dim=2)
+            v = torch.cat([self_v[idx], _split_heads(v, attn.num_heads)], dim=2)
+            new_k.append(k)
+            new_v.append(v)
+
+            h = layer.dropout1(attn.out_proj(_attend(_split_heads(q, attn.num_heads), k, v)))
+            x = x + h if layer.norm_first else layer.norm1(x + h)
+
+            # Cross-attention: 캐시된 memory key/value 사용
+            cross = layer.multihead_attn
+            h = layer.norm2(x) if layer.norm_first else x
+            w_q, _, _ = cross.in_proj_weight.chunk(3)
+            b_q, _, _ = cross.in_proj_bias.chunk(3)
+            q = _split_heads(F.linear(h, w_q, b_q), cross.num_heads)
+
+            h = layer.dropout2(cross.out_proj(_attend(q, mem_k[idx], mem_v[idx])))
+            x = x + h if layer.norm_first else layer.norm2(x + h)
+
+            # Feed-forward
+            h = layer.norm3(x) if layer.norm_first else x
+            h = layer.dropout3(layer.linear2(layer.dropout(layer.activation(layer.linear1(h)))))
+            x = x + h if layer.norm_first else layer.norm3(x + h)
+
+        if self.transformer_decoder.norm is not None:
+            x = self.transformer_decoder.norm(x)
+
+        return x, torch.stack(new_k), torch.stack(new_v)
+
+    def predict_heads(self, output: torch.Tensor) -> Tuple[torch.Tensor, torch.Tensor, torch.Tensor]:
+        """
+        디코더 출력에서 소스/위치/볼륨 예측
+
+        Args:
+            output: (batch, hidden_dim) - 마지막 토큰의 디코더 출력
+
+        Returns:
+            (source_logits, positions, volumes) - positions/volumes는 sigmoid로 0~1 범위
+        """
+        source_logits = self.source_head(output)
+        positions = torch.sigmoid(self.position_head(output))
+        volumes = torch.sigmoid(self.volume_head(output)).squeeze(-1)
+        return source_logits, positions, volumes
+
+    def eager_ops(self) -> InferenceOps:
+        """모델 메서드를 그대로 사용하는 기본 연산 묶음"""
+        return InferenceOps(self.token_features, self.decode_step, self.predict_heads)
+
+    def generate_scenes(
         self,
         memory: torch.Tensor,
-        num_sources: int,
-        temperature: float = 1.0
-    ) -> Dict:
+        lengths: torch.Tensor,
+        temperature=1.0,
+        use_kv_cache: bool = True,
+        ops: Optional[InferenceOps] = None,
+        uniforms: Optional[torch.Tensor] = None,
+        constraints: Optional[Dict[str, torch.Tensor]] = None
+    ) -> Dict[str, torch.Tensor]:
         """
-        하나의 씬 생성
+        여러 씬을 하나의 배치로 동시에 생성
+
+        행마다 생성할 소스 개수(lengths)가 다르며, 가장 긴 행 길이만큼 디코딩한 뒤
+        길이를 넘는 스텝은 마스크로 제거한다. 결과는 디바이스 텐서로 유지된다.
+
+        샘플링 전에 source_head 로짓을 마스킹하므로 모든 샘플이 제약을 만족한다.
+        이미 나온 소스와 start_token은 항상 제외되고, 남은 스텝이 필수 소스/최소 개수를 채우는 데
+        필요한 만큼만 남으면 해당 소스만 허용한다.
 
         Args:
             memory: 인코딩된 컨텍스트 (batch, seq, hidden_dim)
-            num_sources: 생성할 소스 개수
-            temperature: 샘플링 temperature
+            lengths: (batch,) - 행별 생성할 소스 개수
+            temperature: 샘플링 temperature (float 또는 (batch,) 텐서)
+            use_kv_cache: True면 KV 캐시로 새 토큰만 디코딩,
+                False면 매 스텝 prefix 전체를 다시 계산 (비교/검증용)
+            ops: 증분 디코딩에 사용할 연산 묶음 (None이면 eager)
+            uniforms: (batch, >= max_len) 스텝별 [0, 1) 균등 난수 - 주어지면 역CDF로 샘플링하므로
+                결과가 전역 난수 상태나 같은 배치의 다른 행과 무관하게 결정됨 (None이면 multinomial)
+            constraints: 행별 제약 마스크 (None이면 중복/start_token 제외만 적용) {
+                'allowed': (batch, num_sources) bool - 허용 소스,
+                'required': (batch, num_sources) bool - 필수 소스,
+                'category': (num_sources,) long - 소스 분류 (0: 음악, 1: 앰비언스),
+                'min_count': (batch, 2), 'max_count': (batch, 2) - 분류별 개수 범위
+            }
 
         Returns:
-            scene_data: {
-                'source_ids': List[int],
-                'positions': List[Tuple[float, float]],
-                'volumes': List[float]
+            {
+                'source_ids': (batch, max_len) - 패딩 위치는 pad_token,
+                'positions': (batch, max_len, 2) - 캔버스 좌표,
+                'volumes': (batch, max_len),
+                'mask': (batch, max_len) - 유효한 소스 위치
             }
         """
         batch_size = memory.shape[0]
         device = memory.device
+        max_len = int(lengths.max())
+        ops = ops or self.eager_ops()
+
+        if isinstance(temperature, torch.Tensor):
+            temperature = temperature.to(device).view(batch_size, 1)
+
+        if uniforms is not None:
+            # 스텝별로 연속된 (batch, 1) 조각
+            uniforms = uniforms[:, :max_len].to(device).t().unsqueeze(-1).contiguous()
+
+        if constraints is None:
+            constraints = self.default_constraints(batch_size, device)
+        allowed = constraints['allowed'].to(device)
+        required = constraints['required'].to(device)
+        category = constraints['category'].to(device)
+        min_count = constraints['min_count'].to(device)
+        max_count = constraints['max_count'].to(device)
+        lengths = lengths.to(device)
+
+        # 씬별로 이미 나온 소스와 분류별 개수 (스텝마다 갱신)
+        used = torch.zeros_like(allowed)
+        counts = torch.zeros_like(min_count)
+        row_category = category.unsqueeze(0).expand(batch_size, -1)
 
         # 시작 토큰
         current_tokens = torch.full((batch_size, 1), self.start_token, dtype=torch.long, device=device)
 
+        if use_kv_cache:
+            self_k, self_v, mem_k, mem_v = (ops.init_decoder_cache or self.init_decoder_cache)(memory)
+            features = ops.token_features(current_tokens)
+
         source_ids = []
         positions = []
         volumes = []
 
-        for _ in range(num_sources):
-            # 현재까지 생성된 토큰 임베딩
-            token_emb = self.source_embedding(current_tokens)
-            dummy_pos = torch.zeros(batch_size, token_emb.shape[1], 2, device=device)
-            dummy_vol = torch.ones(batch_size, token_emb.shape[1], 1, device=device)
+        for step in range(max_len):
+            # Decoder
+            if use_kv_cache:
+                output, self_k, self_v = ops.decode_step(features, self_k, self_v, mem_k, mem_v)
+            else:
+                output = self.decode_full(current_tokens, memory)
+
+            # 마지막 출력으로 예측 (위치/볼륨은 sigmoid로 0~1 범위)
+            source_logits, position, volume = ops.predict_heads(output[:, -1, :])
+
+            # 제약 마스크 적용 후 소스 ID 샘플링
+            source_mask = self._step_mask(
+                allowed, required, used, counts, row_category, min_count, max_count, lengths - step
+            )
+            source_logits = source_logits.masked_fill(~source_mask, float('-inf'))
+            source_probs = F.softmax(source_logits / temperature, dim=-1)
+            if uniforms is None:
+                source_id = torch.multinomial(source_probs, 1).squeeze(-1)
+            else:
+                # 확률 0인 소스가 선택되지 않도록 cdf > u인 첫 위치
+                cdf = source_probs.cumsum(dim=-1)
+                source_id = torch.searchsorted(cdf, uniforms[step], right=True).squeeze(-1)
+                source_id = source_id.clamp_(max=source_probs.shape[-1] - 1)
+                # 부동소수 오차로 cdf 끝을 넘은 경우 가장 확률이 높은 소스
+                valid = source_mask.gather(1, source_id.unsqueeze(1)).squeeze(1)
+                source_id = torch.where(valid, source_id, source_probs.argmax(dim=-1))
+
+            used.scatter_(1, source_id.unsqueeze(1), True)
+            counts.scatter_add_(1, category[source_id].unsqueeze(1), torch.ones_like(counts[:, :1]))
+
+            source_ids.append(source_id)
+            positions.append(position)
+            volumes.append(volume)
 
-            pos_emb = self.position_encoder(dummy_pos)
-            features = torch.cat([token_emb, pos_emb, dummy_vol], dim=-1)
-            features = self.feature_projection(features)
+            # 다음 입력으로 사용
+            current_tokens = torch.cat([current_tokens, source_id.unsqueeze(1)], dim=1)
+            if use_kv_cache:
+                features = ops.token_features(source_id.unsqueeze(1))
 
-            # Decoder
-            output = self.transformer_decoder(features, memory)
+        # 길이를 넘는 스텝 마스킹
+        mask = torch.arange(max_len, device=device).unsqueeze(0) < lengths.to(device).unsqueeze(1)
+        canvas = torch.tensor([1000.0, 600.0], device=device)  # 캔버스 크기로 스케일
 
-            # 마지막 출력으로 예측
-            last_output = output[:, -1, :]
+        return {
+            'source_ids': torch.stack(source_ids, dim=1).masked_fill(~mask, self.pad_token),
+            'positions': torch.stack(positions, dim=1) * canvas * mask.unsqueeze(-1),
+            'volumes': torch.stack(volumes, dim=1) * mask,
+            'mask': mask
+        }
 
-            # 소스 ID 예측
-            source_logits = self.source_head(last_output) / temperature
-            source_probs = F.softmax(source_logits, dim=-1)
-            source_id = torch.multinomial(source_probs, 1).squeeze(-1)
+    def default_constraints(self, batch_size: int, device) -> Dict[str, torch.Tensor]:
+        """중복/start_token 제외만 적용하는 제약 마스크"""
+        allowed = torch.ones(batch_size, self.num_sources, dtype=torch.bool, device=device)
+        allowed[:, self.start_token] = False
 
-            # 위치 예측 (sigmoid로 0~1 범위로 정규화)
-            position = torch.sigmoid(self.position_head(last_output))
+        return {
+            'allowed': allowed,
+            'required': torch.zeros_like(allowed),
+            'category': (torch.arange(self.num_sources, device=device) >= self.num_sources // 2).long(),
+            'min_count': torch.zeros(batch_size, 2, dtype=torch.long, device=device),
+            'max_count': torch.full((batch_size, 2), self.num_sources, dtype=torch.long, device=device)
+        }
 
-            # 볼륨 예측
-            volume = torch.sigmoid(self.volume_head(last_output))
+    @staticmethod
+    def _step_mask(
+        allowed: torch.Tensor,
+        required: torch.Tensor,
+        used: torch.Tensor,
+        counts: torch.Tensor,
+        row_category: torch.Tensor,
+        min_count: torch.Tensor,
+        max_count: torch.Tensor,
+        remaining: torch.Tensor
+    ) -> torch.Tensor:
+        """
+        현재 스텝에서 샘플링 가능한 소스 (batch, num_sources)
 
-            # 저장
-            source_ids.append(source_id.item())
-            positions.append((position[0, 0].item() * 1000, position[0, 1].item() * 600))  # 캔버스 크기로 스케일
-            volumes.append(volume[0, 0].item())
+        Args:
+            remaining: (batch,) 이번 스텝을 포함해 남은 스텝 수
+        """
+        available = allowed & ~used
+        required_left = required & ~used
 
-            # 다음 입력으로 사용
-            current_tokens = torch.cat([current_tokens, source_id.unsqueeze(1)], dim=1)
+        # 분류별로 아직 나오지 않은 필수 소스 수만큼 자리를 남겨 둠
+        reserved = torch.stack(
+            [(required_left & (row_category == c)).sum(dim=-1) for c in range(counts.shape[1])], dim=-1
+        )
+        full = (counts + reserved >= max_count).gather(1, row_category)
+        mask = available & (required_left | ~full)
+
+        # 남은 스텝이 필수 소스/분류별 최소 개수를 채우는 데 필요한 만큼이면 필수 소스와 부족한 분류만
+        shortfall = (min_count - counts - reserved).clamp(min=0)
+        need = reserved + shortfall
+        forced = (need.sum(dim=-1) >= remaining).unsqueeze(1)
+        mask = torch.where(forced, mask & (required_left | (shortfall.gather(1, row_category) > 0)), mask)
+
+        # 제약끼리 충돌해 후보가 없으면 중복/허용 조건만 적용
+        return torch.where(mask.any(dim=-1, keepdim=True), mask, available)
+
+    def generate_scene(
+        self,
+        memory: torch.Tensor,
+        num_sources: int,
+        temperature: float = 1.0,
+        use_kv_cache: bool = True
+    ) -> Dict:
+        """
+        하나의 씬 생성
+
+        Args:
+            memory: 인코딩된 컨텍스트 (batch, seq, hidden_dim)
+            num_sources: 생성할 소스 개수
+            temperature: 샘플링 temperature
+            use_kv_cache: True면 KV 캐시로 새 토큰만 디코딩,
+                False면 매 스텝 prefix 전체를 다시 계산 (비교/검증용)
+
+        Returns:
+            scene_data: {
+                'source_ids': List[int],
+                'positions': List[Tuple[float, float]],
+                'volumes': List[float]
+            }
+        """
+        lengths = torch.full((memory.shape[0],), num_sources, dtype=torch.long)
+        scene = self.generate_scenes(memory, lengths, temperature, use_kv_cache)
 
         return {
-            'source_ids': source_ids,
-            'positions': positions,
-            'volumes': volumes
+            'source_ids': scene['source_ids'][0].tolist(),
+            'positions': [tuple(pos) for pos in scene['positions'][0].tolist()],
+            'volumes': scene['volumes'][0].tolist()
         }
 
-    def forward(self, composition_data: Dict) -> Dict:
+    def forward(self, composition_data: Dict, padding_mask: Optional[torch.Tensor] = None) -> Dict:
         """
         Forward pass (학습용)
 
         Args:
-            composition_data: composition 데이터
+            composition_data: composition 데이터 (배치마다 소스 축 길이가 다를 수 있음)
+            padding_mask: (batch, num_scenes * max_sources) - True인 위치(패딩)는 attention에서 제외
 
         Returns:
             predictions: {
@@ -235,7 +627,7 @@ class CompositionTransformer(nn.Module):
             }
         """
         # 인코딩
-        encoded = self.encode_composition(composition_data)
+        encoded = self.encode_composition(composition_data, padding_mask)
 
         # 예측
         source_logits = self.source_head(encoded)
@@ -249,6 +641,15 @@ class CompositionTransformer(nn.Module):
         }
 
 
+def _file_digest(path: str) -> str:
+    """파일 내용 해시 (컴파일 캐시 키)"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()[:16]
+
+
 class CompositionGenerator:
     """
     Composition 생성기 (고수준 인터페이스)
@@ -258,26 +659,46 @@ class CompositionGenerator:
         self,
         pack: str,
         num_sources: int = 32,  # 각 팩당 32개 소스
-        device: str = "cpu"
+        device: str = "cpu",
+        model_config: Optional[Dict] = None
     ):
+        """
+        Args:
+            model_config: CompositionTransformer 구조 설정 (None이면 기본 6+6 레이어, hidden 256)
+        """
         self.pack = pack
         self.num_sources = num_sources
         self.device = device
         self.version = "v1.0"
+        self.quantization = None  # 양자화 모드 (None이면 fp32)
+        self.num_scenes = 16  # composition당 씬 개수
+        self.max_scene_sources = 6  # 씬당 최대 소스 개수
+        self.metrics = CompositionMetrics()  # best-of-N 후보 점수
+
+        # 소스 분류 (_create_source_mapping 순서: 앞 절반 음악, 뒤 절반 앰비언스)
+        self.source_categories = (torch.arange(num_sources) >= num_sources // 2).long()
+
+        # 제약 마스크 LRU 캐시
+        self._constraint_cache: "OrderedDict[Optional[SceneConstraints], Dict]" = OrderedDict()
+        self._constraint_lock = threading.Lock()
 
         # 모델 생성
-        self.model = CompositionTransformer(
-            num_sources=num_sources,
-            embedding_dim=64,
-            position_dim=32,
-            hidden_dim=256,
-            num_heads=8,
-            num_layers=6
-        ).to(device)
+        config = {
+            'embedding_dim': 64,
+            'position_dim': 32,
+            'hidden_dim': 256,
+            'num_heads': 8,
+            'num_layers': 6,
+            **(model_config or {})
+        }
+        self.model = CompositionTransformer(num_sources=num_sources, **config).to(device)
 
         # 팩별 소스 매핑
         self.source_mapping = self._create_source_mapping(pack)
 
+        # 디코딩 연산 백엔드 (load(backend=...)로 컴파일된 연산으로 교체)
+        self.inference_ops = self.model.eager_ops()
+
     def _create_source_mapping(self, pack: str) -> Dict:
         """팩별 소스 ID 매핑"""
         pack_prefix = {
@@ -331,88 +752,503 @@ class CompositionGenerator:
 
         return mapping
 
-    def generate(self, temperature: float = 1.0) -> Dict:
+    def generate(
+        self,
+        temperature: float = 1.0,
+        use_kv_cache: bool = True,
+        seed: Optional[int] = None
+    ) -> Dict:
         """
         새로운 composition 생성
 
         Args:
             temperature: 생성 다양성
+            use_kv_cache: KV 캐시 증분 디코딩 사용 여부 (False면 전체 재계산)
+            seed: 난수 시드 (같은 시드/temperature/모델이면 같은 결과)
 
         Returns:
             composition 데이터
         """
-        self.model.eval()
+        return self.generate_batch(1, temperatures=temperature, use_kv_cache=use_kv_cache, seeds=[seed])[0]
 
-        with torch.no_grad():
-            # 빈 메모리로 시작 (unconditional generation)
-            memory = torch.randn(1, 1, self.model.hidden_dim).to(self.device)
+    def generate_batch(
+        self,
+        n: int,
+        temperatures=1.0,
+        use_kv_cache: bool = True,
+        seeds: Optional[List[Optional[int]]] = None,
+        memory: Optional[torch.Tensor] = None,
+        constraints=None
+    ) -> List[Dict]:
+        """
+        여러 composition을 하나의 배치 디코딩으로 생성
 
-            scenes = []
+        n개 composition × 16개 씬을 (n * 16) 행 배치로 함께 디코딩한다.
+        composition마다 별도의 메모리(노이즈)를 사용하고, 같은 composition의 씬은 메모리를 공유한다.
+        씬 길이, 메모리, 샘플링 난수는 composition별 난수 생성기에서 미리 뽑으므로
+        시드를 주면 같은 배치의 다른 composition과 관계없이 결과가 재현된다.
 
-            for scene_id in range(16):
-                # 씬당 소스 개수 (2~6개)
-                num_sources = np.random.randint(2, 7)
+        Args:
+            n: 생성할 composition 개수
+            temperatures: 공통 temperature(float) 또는 composition별 temperature 리스트
+            use_kv_cache: KV 캐시 증분 디코딩 사용 여부 (False면 전체 재계산)
+            seeds: composition별 난수 시드 (None 항목/None이면 매번 다른 결과)
+            memory: 디코더 메모리 (1 또는 n, mem_len, hidden_dim) - encode_memory() 결과 등,
+                None이면 노이즈 (unconditional generation)
+            constraints: 공통 SceneConstraints 또는 composition별 리스트 (None이면 기본 제약)
 
-                # 씬 생성
-                scene_data = self.model.generate_scene(
-                    memory=memory,
-                    num_sources=num_sources,
-                    temperature=temperature
-                )
+        Returns:
+            composition 데이터 리스트 (길이 n)
+        """
+        if isinstance(temperatures, (int, float)):
+            temperatures = [float(temperatures)] * n
+        if len(temperatures) != n:
+            raise ValueError(f"Expected {n} temperatures, got {len(temperatures)}")
 
-                # 포맷 변환
-                placed_sources = []
-                for idx in range(len(scene_data['source_ids'])):
-                    source_id = scene_data['source_ids'][idx]
-                    source_name = self.source_mapping.get(source_id, self.source_mapping[0])
-
-                    placed_sources.append({
-                        "id": f"gen_{scene_id}_{idx}",
-                        "sourceId": source_name,
-                        "x": float(scene_data['positions'][idx][0]),
-                        "y": float(scene_data['positions'][idx][1]),
-                        "volume": float(scene_data['volumes'][idx]),
-                        "muted": False
-                    })
-
-                scenes.append({
-                    "id": scene_id,
-                    "placedSources": placed_sources
-                })
+        seeds = seeds if seeds is not None else [None] * n
+        if len(seeds) != n:
+            raise ValueError(f"Expected {n} seeds, got {len(seeds)}")
+
+        if constraints is None or isinstance(constraints, SceneConstraints):
+            constraints = [constraints] * n
+        if len(constraints) != n:
+            raise ValueError(f"Expected {n} constraints, got {len(constraints)}")
+
+        scene_data = self._decode_batch(temperatures, seeds, use_kv_cache, memory, constraints)
+        return [self._build_composition(scene_data, idx) for idx in range(n)]
+
+    def generate_top_k(
+        self,
+        k: int,
+        num_candidates: int,
+        temperature: float = 1.0,
+        seed: Optional[int] = None,
+        memory: Optional[torch.Tensor] = None,
+        constraints: Optional[SceneConstraints] = None
+    ) -> List[Dict]:
+        """
+        후보를 한 배치로 디코딩하고 음악성 점수가 높은 k개 반환 (best-of-N)
+
+        점수는 호스트 배열에서 한 번에 계산하므로 디코딩에 비해 비용이 작다.
+
+        Args:
+            k: 반환할 composition 개수
+            num_candidates: 디코딩할 후보 개수 (k 이상)
+            temperature: 생성 다양성
+            seed: 난수 시드 (같은 시드면 같은 후보/결과, 첫 후보는 generate(seed=seed)와 같음)
+            memory: 디코더 메모리 (None이면 노이즈)
+            constraints: 생성 제약 (None이면 기본 제약)
+
+        Returns:
+            점수 내림차순 composition 리스트 (길이 k)
+        """
+        num_candidates = max(k, num_candidates)
+
+        seeds = [None] * num_candidates
+        if seed is not None:
+            seeds = [seed] + [[seed, idx] for idx in range(1, num_candidates)]
+
+        scene_data = self._decode_batch(
+            [temperature] * num_candidates, seeds, memory=memory, constraints=[constraints] * num_candidates
+        )
 
+        scores = self.metrics.compute_musicality_scores(
+            scene_data['positions'], scene_data['volumes'], scene_data['mask']
+        )
+        top = np.argsort(-scores, kind="stable")[:k]
+
+        return [self._build_composition(scene_data, idx) for idx in top]
+
+    def _decode_batch(
+        self,
+        temperatures: List[float],
+        seeds: List,
+        use_kv_cache: bool = True,
+        memory: Optional[torch.Tensor] = None,
+        constraints: Optional[List[Optional[SceneConstraints]]] = None
+    ) -> Dict[str, np.ndarray]:
+        """
+        composition별 temperature/시드/제약으로 (n * 16) 행을 한 배치로 디코딩
+
+        Returns:
+            호스트 배열 딕셔너리 ('source_ids', 'positions', 'volumes', 'mask'), 각 (n, 16, ...)
+        """
+        n = len(temperatures)
+        num_scenes = self.num_scenes
+
+        lengths, noise, uniforms = self._draw_noise(seeds)
+
+        # composition별 제약 마스크, 씬 길이는 제약을 만족할 수 있는 범위로 조정
+        masks = [self.constraint_masks(item) for item in (constraints or [None] * n)]
+        min_lengths = np.array([mask['min_length'] for mask in masks])[:, None]
+        max_lengths = np.array([mask['max_length'] for mask in masks])[:, None]
+        lengths = np.clip(lengths, min_lengths, max_lengths)
+
+        row_constraints = {
+            key: torch.stack([mask[key] for mask in masks]).repeat_interleave(num_scenes, dim=0)
+            for key in ('allowed', 'required', 'min_count', 'max_count')
+        }
+        row_constraints['category'] = self.source_categories
+
+        self.model.eval()
+
+        with torch.no_grad():
+            # 모든 씬을 한 배치로 생성
+            lengths = torch.from_numpy(lengths.reshape(-1)).to(self.device)
+            uniforms = torch.from_numpy(uniforms.reshape(n * num_scenes, -1)).to(self.device)
+            row_temperatures = torch.tensor(temperatures, device=self.device).repeat_interleave(num_scenes)
+
+            # 메모리가 없으면 노이즈로 시작 (unconditional generation), 같은 composition의 씬은 메모리 공유
+            if memory is None:
+                memory = torch.from_numpy(noise).unsqueeze(1)
+            memory = memory.to(self.device).expand(n, -1, -1).repeat_interleave(num_scenes, dim=0)
+
+            scene_data = self.model.generate_scenes(
+                memory=memory,
+                lengths=lengths,
+                temperature=row_temperatures,
+                use_kv_cache=use_kv_cache,
+                ops=self.inference_ops,
+                uniforms=uniforms,
+                constraints=row_constraints
+            )
+
+            # 호스트로 한 번에 복사
+            return {
+                key: value.cpu().numpy().reshape(n, num_scenes, *value.shape[1:])
+                for key, value in scene_data.items()
+            }
+
+    def _build_composition(self, scene_data: Dict[str, np.ndarray], idx: int) -> Dict:
+        """_decode_batch() 결과의 idx번째 composition 데이터"""
         return {
             "pack": self.pack,
-            "scenes": scenes,
+            "scenes": self._format_scenes({key: value[idx] for key, value in scene_data.items()}),
             "masterVolume": 1.0,
             "musicVolume": 1.0,
             "ambienceVolume": 0.7
         }
 
+    def constraint_masks(self, constraints: Optional[SceneConstraints] = None) -> Dict:
+        """
+        제약을 소스 마스크로 변환 (최근 사용한 CONSTRAINT_CACHE_SIZE개 제약은 다시 계산하지 않음)
+
+        Args:
+            constraints: 생성 제약 (None이면 중복/start_token 제외만)
+
+        Returns:
+            {
+                'allowed': (num_sources,) bool, 'required': (num_sources,) bool,
+                'min_count': (2,) long, 'max_count': (2,) long - 분류별 (음악, 앰비언스) 개수 범위,
+                'min_length': int, 'max_length': int - 제약을 만족할 수 있는 씬 길이 범위
+            }
+
+        Raises:
+            ConstraintError: 모르는 소스이거나 만족할 수 없는 제약
+        """
+        key = constraints
+        with self._constraint_lock:
+            masks = self._constraint_cache.get(key)
+            if masks is not None:
+                self._constraint_cache.move_to_end(key)
+                return masks
+
+        constraints = constraints or SceneConstraints()
+        source_to_idx = {name: idx for idx, name in self.source_mapping.items()}
+
+        unknown = [name for name in constraints.include + constraints.exclude if name not in source_to_idx]
+        if unknown:
+            raise ConstraintError(f"Unknown sources for {self.pack}: {', '.join(unknown)}")
+
+        allowed = torch.ones(self.num_sources, dtype=torch.bool)
+        allowed[self.model.start_token] = False
+        for name in constraints.exclude:
+            allowed[source_to_idx[name]] = False
+
+        required = torch.zeros(self.num_sources, dtype=torch.bool)
+        for name in constraints.include:
+            required[source_to_idx[name]] = True
+
+        if (required & ~allowed).any():
+            raise ConstraintError("Included sources must not be excluded or reserved")
+        if int(required.sum()) > self.max_scene_sources:
+            raise ConstraintError(f"At most {self.max_scene_sources} sources can be included per scene")
+
+        max_sources = self.max_scene_sources
+        min_count = torch.tensor([constraints.min_music, constraints.min_ambience])
+        max_count = torch.tensor([
+            max_sources if constraints.max_music is None else constraints.max_music,
+            max_sources if constraints.max_ambience is None else constraints.max_ambience
+        ])
+
+        # 분류별로 가능한 개수: 필수 소스 수 이상, 허용된 소스 수 이하
+        allowed_per_category = torch.bincount(self.source_categories[allowed], minlength=2)
+        required_per_category = torch.bincount(self.source_categories[required], minlength=2)
+        max_count = torch.minimum(max_count, allowed_per_category)
+        min_count = torch.maximum(min_count, required_per_category)
+        if (min_count > max_count).any():
+            raise ConstraintError("Music/ambience quotas cannot be satisfied with the allowed sources")
+
+        min_length = max(2, int(min_count.sum()))
+        max_length = min(max_sources, int(max_count.sum()))
+        if min_length > max_length:
+            raise ConstraintError(f"Constraints need {min_length} sources per scene, at most {max_length} possible")
+
+        masks = {
+            'allowed': allowed,
+            'required': required,
+            'min_count': min_count,
+            'max_count': max_count,
+            'min_length': min_length,
+            'max_length': max_length
+        }
+        with self._constraint_lock:
+            self._constraint_cache[key] = masks
+            while len(self._constraint_cache) > CONSTRAINT_CACHE_SIZE:
+                self._constraint_cache.popitem(last=False)
+
+        return masks
+
+    def generate_stream(
+        self,
+        temperature: float = 1.0,
+        seed: Optional[int] = None
+    ) -> Iterator[Dict]:
+        """
+        composition의 씬을 하나씩 디코딩하면서 바로 반환
+
+        첫 씬을 전체 composition보다 먼저 받을 수 있다 (대신 전체 시간은 배치 생성보다 길다).
+        같은 시드면 generate(seed=...)와 같은 씬을 같은 순서로 생성한다.
+
+        Args:
+            temperature: 생성 다양성
+            seed: 난수 시드 (None이면 매번 다른 결과)
+
+        Yields:
+            씬 딕셔너리 ({'id': int, 'placedSources': [...]}), 씬 순서대로
+        """
+        lengths, memory, uniforms = self._draw_noise([seed])
+
+        self.model.eval()
+
+        lengths = torch.from_numpy(lengths[0]).to(self.device)
+        uniforms = torch.from_numpy(uniforms[0]).to(self.device)
+        memory = torch.from_numpy(memory).to(self.device).unsqueeze(1)
+
+        for scene_id in range(self.num_scenes):
+            with torch.no_grad():
+                scene_data = self.model.generate_scenes(
+                    memory=memory,
+                    lengths=lengths[scene_id:scene_id + 1],
+                    temperature=temperature,
+                    ops=self.inference_ops,
+                    uniforms=uniforms[scene_id:scene_id + 1]
+                )
+                scene_data = {key: value.cpu().numpy() for key, value in scene_data.items()}
+
+            yield self._format_scenes(scene_data, first_scene_id=scene_id)[0]
+
+    def encode_memory(self, composition: Dict) -> torch.Tensor:
+        """
+        기존 composition을 인코딩해 디코더 메모리로 사용 (remix)
+
+        패딩 위치는 인코더 attention에서 제외하고 결과에서도 잘라내므로,
+        메모리 길이는 composition의 실제 소스 개수와 같다.
+
+        Args:
+            composition: {'scenes': [{'id': int, 'placedSources': [...]}, ...]}
+
+        Returns:
+            memory: (1, num_placed_sources, hidden_dim)
+
+        Raises:
+            RemixSourceError: 모델이 아는 소스가 하나도 없는 composition
+        """
+        source_to_idx = {name: idx for idx, name in self.source_mapping.items()}
+        max_sources = self.model.max_sources_per_scene
+
+        source_ids = np.full((self.num_scenes, max_sources), self.model.pad_token, dtype=np.int64)
+        positions = np.zeros((self.num_scenes, max_sources, 2), dtype=np.float32)
+        volumes = np.zeros((self.num_scenes, max_sources), dtype=np.float32)
+        canvas = np.array([1000.0, 600.0], dtype=np.float32)
+
+        for scene in composition["scenes"]:
+            scene_id = scene["id"]
+            if scene_id >= self.num_scenes:
+                continue
+
+            placed_sources = [
+                source for source in scene.get("placedSources", [])
+                if source["sourceId"] in source_to_idx
+            ][:max_sources]
+
+            for src_idx, source in enumerate(placed_sources):
+                source_ids[scene_id, src_idx] = source_to_idx[source["sourceId"]]
+                positions[scene_id, src_idx] = [source.get("x", 500), source.get("y", 300)]
+                volumes[scene_id, src_idx] = source.get("volume", 1.0)
+
+        valid = (source_ids != self.model.pad_token).reshape(-1)
+        if not valid.any():
+            raise RemixSourceError(f"Composition has no sources known to the {self.pack} model")
+
+        composition_data = {
+            "source_ids": torch.from_numpy(source_ids).unsqueeze(0).to(self.device),
+            "positions": torch.from_numpy(positions / canvas).unsqueeze(0).to(self.device),
+            "volumes": torch.from_numpy(volumes).unsqueeze(0).to(self.device)
+        }
+        valid = torch.from_numpy(valid).to(self.device)
+
+        self.model.eval()
+
+        with torch.no_grad():
+            encoded = self.model.encode_composition(composition_data, padding_mask=~valid.unsqueeze(0))
+
+        return encoded[:, valid]
+
+    def _draw_noise(self, seeds: List) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        composition별 난수 생성기에서 씬당 소스 개수 (2~6개), 메모리 노이즈, 스텝별 샘플링 난수를 뽑음
+
+        Returns:
+            lengths (n, num_scenes), memory (n, hidden_dim), uniforms (n, num_scenes, max_sources)
+        """
+        n = len(seeds)
+        lengths = np.empty((n, self.num_scenes), dtype=np.int64)
+        memory = np.empty((n, self.model.hidden_dim), dtype=np.float32)
+        uniforms = np.empty((n, self.num_scenes, self.max_scene_sources), dtype=np.float32)
+
+        for idx, seed in enumerate(seeds):
+            rng = np.random.default_rng(seed)
+            lengths[idx] = rng.integers(2, self.max_scene_sources + 1, size=self.num_scenes)
+            memory[idx] = rng.standard_normal(self.model.hidden_dim, dtype=np.float32)
+            uniforms[idx] = rng.random((self.num_scenes, self.max_scene_sources), dtype=np.float32)
+
+        return lengths, memory, uniforms
+
+    def _format_scenes(self, scene_data: Dict[str, np.ndarray], first_scene_id: int = 0) -> List[Dict]:
+        """
+        generate_scenes() 출력(호스트 배열)을 씬 리스트로 변환
+
+        Args:
+            scene_data: 'source_ids', 'positions', 'volumes', 'mask' 배열 (행 = 씬)
+            first_scene_id: 첫 행의 씬 ID
+
+        Returns:
+            scenes: [{'id': int, 'placedSources': [...]}, ...]
+        """
+        source_ids = scene_data['source_ids'].tolist()
+        positions = scene_data['positions'].tolist()
+        volumes = scene_data['volumes'].tolist()
+        lengths = scene_data['mask'].sum(axis=1).tolist()
+
+        scenes = []
+        for row, length in enumerate(lengths):
+            scene_id = first_scene_id + row
+            placed_sources = []
+            for idx in range(length):
+                source_name = self.source_mapping.get(source_ids[row][idx], self.source_mapping[0])
+
+                placed_sources.append({
+                    "id": f"gen_{scene_id}_{idx}",
+                    "sourceId": source_name,
+                    "x": positions[row][idx][0],
+                    "y": positions[row][idx][1],
+                    "volume": volumes[row][idx],
+                    "muted": False
+                })
+
+            scenes.append({
+                "id": scene_id,
+                "placedSources": placed_sources
+            })
+
+        return scenes
+
     def save(self, path: str):
         """모델 저장"""
         torch.save({
             'model_state_dict': self.model.state_dict(),
             'pack': self.pack,
             'num_sources': self.num_sources,
+            'model_config': self.model.config(),
             'version': self.version,
             'source_mapping': self.source_mapping
         }, path)
 
+    @staticmethod
+    def checkpoint_version(path: str) -> str:
+        """
+        모델을 만들지 않고 체크포인트의 모델 버전만 읽기
+
+        가중치는 memory map으로 열기만 하고 읽지 않는다.
+        """
+        checkpoint = torch.load(path, map_location="cpu", mmap=True)
+        return checkpoint.get('version', 'v1.0')
+
     @classmethod
-    def load(cls, path: str, device: str = "cpu"):
-        """모델 로드"""
+    def load(
+        cls,
+        path: str,
+        device: str = "cpu",
+        backend: str = "eager",
+        compile_cache_dir: Optional[str] = None,
+        quantize: Optional[str] = None
+    ):
+        """
+        모델 로드
+
+        Args:
+            path: 체크포인트 경로
+            device: 디바이스
+            backend: 추론 백엔드
+                - "eager": 일반 PyTorch 실행
+                - "script": TorchScript로 trace한 디코딩 연산 (compile_cache_dir에 캐시)
+                - "compile": torch.compile로 컴파일한 디코딩 연산
+                - "onnx": ONNX로 export한 디코딩 연산을 onnxruntime CPU로 실행 (compile_cache_dir에 캐시)
+                컴파일 실패 또는 eager와 출력이 다르면 eager로 fallback
+            compile_cache_dir: 컴파일 결과 캐시 디렉토리 (None이면 체크포인트 옆 .compile_cache)
+            quantize: "int8"이면 Linear 레이어를 int8 동적 양자화 (CPU 전용)
+        """
         checkpoint = torch.load(path, map_location=device)
 
         generator = cls(
             pack=checkpoint['pack'],
             num_sources=checkpoint['num_sources'],
-            device=device
+            device=device,
+            model_config=checkpoint.get('model_config')
         )
 
         generator.model.load_state_dict(checkpoint['model_state_dict'])
         generator.version = checkpoint.get('version', 'v1.0')
         generator.source_mapping = checkpoint.get('source_mapping', generator.source_mapping)
 
+        if quantize == "int8":
+            from models.transformer.quantization import quantize_int8
+
+            generator.model = quantize_int8(generator.model)
+            generator.inference_ops = generator.model.eager_ops()
+            generator.quantization = quantize
+        elif quantize is not None:
+            raise ValueError(f"Unknown quantization mode: {quantize}")
+
+        # 디코딩 루프용 토큰 특징 테이블을 로드 시점에 계산 (생성 시 eval() 전환으로 비워지지 않도록 먼저 eval)
+        generator.model.eval()
+        generator.model.token_feature_table()
+
+        if backend != "eager":
+            from models.transformer.compiled import build_inference_ops
+
+            if compile_cache_dir is None:
+                compile_cache_dir = os.path.join(os.path.dirname(os.path.abspath(path)), ".compile_cache")
+
+            generator.inference_ops = build_inference_ops(
+                generator.model,
+                backend=backend,
+                cache_dir=compile_cache_dir,
+                cache_key=f"{_file_digest(path)}_{quantize or 'fp32'}",
+                quantization=generator.quantization
+            )
+
         return generator
 
     def parameters(self):
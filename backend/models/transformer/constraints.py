@@ -0,0 +1,26 @@
+"""
+Composition 생성 제약 및 입력 오류 (torch 없이 API 계층에서도 import 가능)
+"""
+from typing import NamedTuple, Optional, Tuple
+
+
+class SceneConstraints(NamedTuple):
+    """
+    씬 단위 생성 제약 (소스 이름 기준, 모든 씬에 같은 제약 적용)
+
+    같은 씬 안의 소스 중복과 start_token은 제약이 없어도 항상 제외된다.
+    """
+    include: Tuple[str, ...] = ()  # 모든 씬에 반드시 포함할 소스
+    exclude: Tuple[str, ...] = ()  # 생성하지 않을 소스
+    min_music: int = 0
+    max_music: Optional[int] = None
+    min_ambience: int = 0
+    max_ambience: Optional[int] = None
+
+
+class ConstraintError(ValueError):
+    """만족할 수 없는 생성 제약"""
+
+
+class RemixSourceError(ValueError):
+    """remix할 원본 composition에 모델이 아는 소스가 없음"""
@@ -0,0 +1,246 @@
+"""
+CompositionTransformer 디코딩 연산 ONNX export 및 onnxruntime 실행
+
+토큰 특징(임베딩 + 투영), 디코더 KV 캐시 초기화, 디코더 스텝, 출력 헤드를 각각 ONNX 그래프로 내보내고
+onnxruntime CPU execution provider로 실행하는 InferenceOps를 만든다.
+디코딩 루프와 KV 캐시 관리는 기존 generate_scenes()를 그대로 사용한다.
+parity 검사를 통과하면 onnxruntime이 대신하는 torch 디코더/출력 헤드 가중치는 해제한다 (release_torch_decoder).
+
+예:
+    python -m models.transformer.onnx_backend --checkpoint models/checkpoints/adventure_model.pth
+"""
+import inspect
+import os
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+import torch
+from loguru import logger
+
+from models.transformer.compiled import (
+    _DecoderInit, _DecoderStep, _Heads, _TokenFeatures, _example_inputs, _example_memory
+)
+from models.transformer.composition_generator import CompositionTransformer, InferenceOps
+
+OPSET_VERSION = 17
+
+# torch 2.9+는 dynamo exporter가 기본값이므로 동적 축을 지정하는 TorchScript 기반 exporter를 명시
+_EXPORT_KWARGS = {"dynamo": False} if "dynamo" in inspect.signature(torch.onnx.export).parameters else {}
+
+# 그래프 이름 → (입력 이름, 출력 이름, 동적 축)
+_GRAPHS: Dict[str, Tuple[List[str], List[str], Dict[str, Dict[int, str]]]] = {
+    "token_features": (
+        ["tokens"],
+        ["features"],
+        {"tokens": {0: "batch", 1: "seq"}, "features": {0: "batch", 1: "seq"}}
+    ),
+    "init_decoder_cache": (
+        ["memory"],
+        ["mem_k", "mem_v"],
+        {"memory": {0: "batch", 1: "mem"}, "mem_k": {1: "batch", 3: "mem"}, "mem_v": {1: "batch", 3: "mem"}}
+    ),
+    "decode_step": (
+        ["features", "self_k", "self_v", "mem_k", "mem_v"],
+        ["output", "new_self_k", "new_self_v"],
+        {
+            "features": {0: "batch"},
+            "self_k": {1: "batch", 3: "past"},
+            "self_v": {1: "batch", 3: "past"},
+            "mem_k": {1: "batch", 3: "mem"},
+            "mem_v": {1: "batch", 3: "mem"},
+            "output": {0: "batch"},
+            "new_self_k": {1: "batch", 3: "total"},
+            "new_self_v": {1: "batch", 3: "total"}
+        }
+    ),
+    "predict_heads": (
+        ["output"],
+        ["source_logits", "positions", "volumes"],
+        {"output": {0: "batch"}, "source_logits": {0: "batch"}, "positions": {0: "batch"}, "volumes": {0: "batch"}}
+    )
+}
+
+
+def onnx_paths(prefix: str) -> Dict[str, str]:
+    """그래프별 .onnx 파일 경로"""
+    return {name: f"{prefix}_{name}.onnx" for name in _GRAPHS}
+
+
+def export_onnx(model: CompositionTransformer, prefix: str) -> Dict[str, str]:
+    """
+    디코딩 연산 4개를 ONNX로 export
+
+    토큰 특징은 토큰별 투영 테이블 조회로 export되므로 그래프에 테이블이 상수로 들어간다.
+
+    Args:
+        model: 가중치가 로드된 fp32 모델 (eval 모드로 전환됨)
+        prefix: 출력 파일 prefix ({prefix}_{graph}.onnx)
+
+    Returns:
+        그래프 이름 → 파일 경로
+    """
+    model.eval()
+    paths = onnx_paths(prefix)
+    os.makedirs(os.path.dirname(os.path.abspath(prefix)), exist_ok=True)
+
+    with torch.no_grad():
+        tokens, features, cache = _example_inputs(model)
+        output, _, _ = model.decode_step(features, *cache)
+
+        modules = {
+            "token_features": (_TokenFeatures(model), (tokens,)),
+            "init_decoder_cache": (_DecoderInit(model), (_example_memory(model),)),
+            "decode_step": (_DecoderStep(model), (features, *cache)),
+            "predict_heads": (_Heads(model), (output[:, -1, :],))
+        }
+
+        for name, (module, args) in modules.items():
+            input_names, output_names, dynamic_axes = _GRAPHS[name]
+
+            # export 후 wrapper의 학습 모드가 복원되면서 모델까지 train 모드가 되지 않도록 eval로 export
+            module.eval()
+            torch.onnx.export(
+                module,
+                args,
+                paths[name],
+                input_names=input_names,
+                output_names=output_names,
+                dynamic_axes=dynamic_axes,
+                opset_version=OPSET_VERSION,
+                **_EXPORT_KWARGS
+            )
+
+    logger.info(f"Exported ONNX decoding ops: {prefix}")
+    return paths
+
+
+class _OnnxFunction:
+    """
+    ONNX 그래프 하나를 torch 텐서 입출력으로 실행
+
+    세션은 처음 호출한 프로세스에서 만든다 (fork한 추론 워커가 부모의 세션 스레드를 물려받지 않도록).
+    """
+
+    def __init__(self, path: str, num_threads: Optional[int] = None):
+        self.path = path
+        self.num_threads = num_threads
+        self._session = None
+        self._pid = None
+
+    @property
+    def session(self):
+        if self._session is None or self._pid != os.getpid():
+            import onnxruntime as ort
+
+            options = ort.SessionOptions()
+            options.intra_op_num_threads = self.num_threads or torch.get_num_threads()
+            options.inter_op_num_threads = 1
+            options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+
+            self._session = ort.InferenceSession(self.path, options, providers=["CPUExecutionProvider"])
+            self._pid = os.getpid()
+            self._input_names = [item.name for item in self._session.get_inputs()]
+
+        return self._session
+
+    def __call__(self, *args: torch.Tensor):
+        session = self.session
+        feeds = {name: arg.detach().cpu().numpy() for name, arg in zip(self._input_names, args)}
+        outputs = [torch.from_numpy(np.ascontiguousarray(value)) for value in session.run(None, feeds)]
+        return outputs[0] if len(outputs) == 1 else tuple(outputs)
+
+    def memory_bytes(self) -> int:
+        """세션이 올리는 가중치 크기 (근사: .onnx 파일 크기)"""
+        return os.path.getsize(self.path) if os.path.exists(self.path) else 0
+
+    def __getstate__(self):
+        # 세션은 pickle하지 않고 워커에서 다시 생성
+        return {"path": self.path, "num_threads": self.num_threads, "_session": None, "_pid": None}
+
+
+class _OnnxDecoderInit:
+    """ONNX memory key/value 그래프 + 길이 0 self-attention 캐시 (CompositionTransformer.init_decoder_cache와 같은 출력)"""
+
+    def __init__(self, function: _OnnxFunction):
+        self.function = function
+
+    def __call__(self, memory: torch.Tensor) -> Tuple[torch.Tensor, ...]:
+        mem_k, mem_v = self.function(memory)
+        empty = mem_k.new_zeros(*mem_k.shape[:3], 0, mem_k.shape[-1])
+        return empty, empty.clone(), mem_k, mem_v
+
+    def memory_bytes(self) -> int:
+        return self.function.memory_bytes()
+
+
+def release_torch_decoder(model: CompositionTransformer):
+    """
+    onnxruntime이 대신 실행하는 torch 디코더와 출력 헤드 가중치 해제
+
+    인코더와 임베딩/투영은 remix 인코딩에 계속 사용하므로 유지한다.
+    해제 후에는 eager 디코딩, 학습, 저장에 사용할 수 없다.
+    """
+    model.transformer_decoder = None
+    model.source_head = None
+    model.position_head = None
+    model.volume_head = None
+    model.invalidate_token_features()
+    logger.info("Released torch decoder weights replaced by onnxruntime")
+
+
+def load_onnx_ops(prefix: str, num_threads: Optional[int] = None) -> InferenceOps:
+    """
+    export된 .onnx 파일로 onnxruntime InferenceOps 생성
+
+    Args:
+        prefix: export_onnx()의 prefix
+        num_threads: 세션 intra-op 스레드 수 (None이면 torch 스레드 수)
+    """
+    paths = onnx_paths(prefix)
+    return InferenceOps(
+        _OnnxFunction(paths["token_features"], num_threads),
+        _OnnxFunction(paths["decode_step"], num_threads),
+        _OnnxFunction(paths["predict_heads"], num_threads),
+        "onnx",
+        _OnnxDecoderInit(_OnnxFunction(paths["init_decoder_cache"], num_threads))
+    )
+
+
+def build_onnx_ops(model: CompositionTransformer, cache_prefix: Optional[str]) -> InferenceOps:
+    """
+    ONNX 디코딩 연산 (캐시된 .onnx가 있으면 export 생략)
+
+    Args:
+        model: 가중치가 로드된 모델
+        cache_prefix: .onnx 파일 prefix (None이면 임시 디렉토리에 export)
+    """
+    if cache_prefix is None:
+        import tempfile
+
+        cache_prefix = os.path.join(tempfile.mkdtemp(prefix="composition_onnx_"), "model")
+
+    if all(os.path.exists(path) for path in onnx_paths(cache_prefix).values()):
+        logger.info(f"Loading ONNX decoding ops from cache: {cache_prefix}")
+    else:
+        export_onnx(model, cache_prefix)
+
+    return load_onnx_ops(cache_prefix)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from models.transformer.compiled import check_parity
+    from models.transformer.composition_generator import CompositionGenerator
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--checkpoint", type=str, required=True)
+    parser.add_argument("--output", type=str, default=None, help="출력 prefix (기본: 체크포인트 경로에서 .pth 제거)")
+
+    args = parser.parse_args()
+
+    generator = CompositionGenerator.load(args.checkpoint)
+    prefix = args.output or os.path.splitext(args.checkpoint)[0]
+    export_onnx(generator.model, prefix)
+
+    max_error = check_parity(generator.model, load_onnx_ops(prefix))
+    print(f"Exported {prefix}_*.onnx (parity max error {max_error:.2e})")
@@ -0,0 +1,39 @@
+"""
+CPU 서빙용 int8 동적 양자화
+"""
+import torch
+import torch.nn as nn
+from loguru import logger
+
+from models.transformer.composition_generator import CompositionTransformer
+
+
+def quantize_int8(model: CompositionTransformer) -> CompositionTransformer:
+    """
+    인코더/디코더/출력 헤드의 nn.Linear를 int8 동적 양자화 Linear로 교체
+
+    가중치는 int8로 저장되고 활성값은 실행 시점에 양자화된다 (CPU 전용).
+    MultiheadAttention의 in_proj/out_proj는 nn.Linear 모듈이 아니므로 fp32로 유지된다.
+
+    Args:
+        model: 가중치가 로드된 fp32 모델
+
+    Returns:
+        양자화된 모델 (eval 모드)
+    """
+    model.eval()
+    quantized = torch.ao.quantization.quantize_dynamic(model, {nn.Linear}, dtype=torch.qint8)
+
+    # 인코더 레이어 fast path는 양자화된 Linear를 지원하지 않으므로 일반 경로로 실행
+    for layer in quantized.transformer_encoder.layers:
+        layer.activation_relu_or_gelu = False
+
+    # 양자화된 투영 레이어로 토큰 특징 테이블을 다시 계산
+    quantized.invalidate_token_features()
+
+    num_quantized = sum(
+        isinstance(module, torch.ao.nn.quantized.dynamic.Linear) for module in quantized.modules()
+    )
+    logger.info(f"Quantized {num_quantized} Linear layers to int8")
+
+    return quantized
@@ -4,7 +4,6 @@
 import torch
 import numpy as np
 from typing import Dict, List
-from sklearn.metrics import accuracy_score, precision_recall_fscore_support
 
 
 class CompositionMetrics:
@@ -32,6 +31,9 @@ class CompositionMetrics:
         Returns:
             정확도 (0~1)
         """
+        # sklearn은 import 비용이 커서 사용할 때 import
+        from sklearn.metrics import accuracy_score
+
         # 예측
         pred_ids = torch.argmax(predicted_sources, dim=-1)
 
@@ -219,6 +221,59 @@ class CompositionMetrics:
 
         return np.mean(scores) if scores else 0.0
 
+    def compute_musicality_scores(
+        self,
+        positions: np.ndarray,
+        volumes: np.ndarray,
+        mask: np.ndarray
+    ) -> np.ndarray:
+        """
+        여러 composition의 음악성 점수를 배열 연산으로 한 번에 계산 (compute_musicality_score와 같은 기준)
+
+        Args:
+            positions: (batch, num_scenes, max_sources, 2) 캔버스 좌표
+            volumes: (batch, num_scenes, max_sources)
+            mask: (batch, num_scenes, max_sources) 유효한 소스 위치
+
+        Returns:
+            (batch,) 음악성 점수 (0~1)
+        """
+        mask = mask.astype(np.float64)
+        counts = mask.sum(axis=(1, 2))
+
+        # 1. 소스 개수 적절성 (씬당 평균 2~6개면 1.0, 멀어질수록 감소)
+        avg_sources = mask.sum(axis=2).mean(axis=1)
+        source_score = np.where(
+            (avg_sources >= 2) & (avg_sources <= 6),
+            1.0,
+            np.maximum(0, 1 - np.abs(avg_sources - 4) / 10)
+        )
+
+        # 2. 위치 분산 (축별 모표준편차의 평균이 100~300이면 1.0, 소스가 2개 이상일 때만)
+        safe_counts = np.maximum(counts, 1)[:, None]
+        weights = mask[..., None]
+        mean_position = (positions * weights).sum(axis=(1, 2)) / safe_counts
+        variance = (((positions - mean_position[:, None, None, :]) ** 2) * weights).sum(axis=(1, 2)) / safe_counts
+        position_std = np.sqrt(variance).mean(axis=1)
+        position_score = np.where(
+            (position_std >= 100) & (position_std <= 300),
+            1.0,
+            np.maximum(0, 1 - np.abs(position_std - 200) / 500)
+        )
+        has_position = counts > 1
+
+        # 3. 볼륨 밸런스 (평균 0.6~1.0이면 1.0, 소스가 있을 때만)
+        avg_volume = (volumes * mask).sum(axis=(1, 2)) / safe_counts[:, 0]
+        volume_score = np.where(
+            (avg_volume >= 0.6) & (avg_volume <= 1.0),
+            1.0,
+            np.maximum(0, 1 - np.abs(avg_volume - 0.8))
+        )
+        has_volume = counts > 0
+
+        total = source_score + position_score * has_position + volume_score * has_volume
+        return total / (1 + has_position + has_volume)
+
     def evaluate_batch(
         self,
         predictions: Dict[str, torch.Tensor],
@@ -0,0 +1,167 @@
+"""
+서빙 모델 비교 리포트 (모델 크기, 지연 시간, 생성 품질)
+
+예:
+    python -m training.evaluation.serving_report --checkpoint models/checkpoints/adventure_model.pth
+    python -m training.evaluation.serving_report --checkpoint models/checkpoints/adventure_model.pth \
+        --student models/checkpoints/adventure_model_distill2.pth
+"""
+import io
+import json
+import time
+from typing import Callable, Dict, Optional
+import numpy as np
+import torch
+from loguru import logger
+
+from models.transformer.composition_generator import CompositionGenerator
+from training.evaluation.metrics import CompositionMetrics
+
+
+def model_size_bytes(generator: CompositionGenerator) -> int:
+    """직렬화된 state_dict 크기 (바이트)"""
+    buffer = io.BytesIO()
+    torch.save(generator.model.state_dict(), buffer)
+    return buffer.getbuffer().nbytes
+
+
+def evaluate_generator(
+    generator: CompositionGenerator,
+    num_samples: int = 32,
+    seed: int = 0,
+    temperature: float = 1.0
+) -> Dict:
+    """
+    고정 시드 샘플로 생성기 평가
+
+    Args:
+        generator: 평가할 생성기
+        num_samples: 생성할 composition 개수
+        seed: 난수 시드 (모든 생성기에 같은 값을 사용해야 비교 가능)
+        temperature: 생성 temperature
+
+    Returns:
+        크기/지연 시간/품질 메트릭 딕셔너리
+    """
+    metrics = CompositionMetrics()
+
+    # 워밍업 (첫 호출의 할당/컴파일 비용 제외)
+    generator.generate(temperature=temperature, seed=seed)
+
+    # composition마다 고정 시드를 사용하므로 생성기 간 결과를 1:1로 비교할 수 있음
+    compositions = []
+    latencies = []
+    for idx in range(num_samples):
+        start = time.perf_counter()
+        compositions.append(generator.generate(temperature=temperature, seed=seed + idx))
+        latencies.append(time.perf_counter() - start)
+
+    latencies_ms = np.array(latencies) * 1000
+
+    return {
+        "model_size_mb": model_size_bytes(generator) / (1 << 20),
+        "latency_ms_mean": float(latencies_ms.mean()),
+        "latency_ms_p50": float(np.percentile(latencies_ms, 50)),
+        "latency_ms_p95": float(np.percentile(latencies_ms, 95)),
+        "musicality_score": float(np.mean([metrics.compute_musicality_score(c) for c in compositions])),
+        "diversity_score": float(metrics.compute_diversity_score(compositions)),
+        "compositions": compositions
+    }
+
+
+def source_agreement(reference: Dict, candidate: Dict) -> float:
+    """같은 시드로 생성한 두 결과에서 소스 ID가 일치하는 비율"""
+    matches = 0
+    total = 0
+
+    for ref_comp, cand_comp in zip(reference["compositions"], candidate["compositions"]):
+        for ref_scene, cand_scene in zip(ref_comp["scenes"], cand_comp["scenes"]):
+            for ref_source, cand_source in zip(ref_scene["placedSources"], cand_scene["placedSources"]):
+                matches += ref_source["sourceId"] == cand_source["sourceId"]
+                total += 1
+
+    return matches / total if total else 0.0
+
+
+def compare_generators(
+    variants: Dict[str, Callable[[], CompositionGenerator]],
+    num_samples: int = 32,
+    seed: int = 0,
+    reference: Optional[str] = None
+) -> Dict[str, Dict]:
+    """
+    여러 생성기 변형을 같은 시드로 비교
+
+    Args:
+        variants: 이름 → 생성기를 만드는 함수 (예: {"fp32": ..., "int8": ...})
+        num_samples: 변형별 생성 개수
+        seed: 난수 시드
+        reference: 소스 일치율 비교 기준 변형 이름 (None이면 첫 번째)
+
+    Returns:
+        이름 → 메트릭 딕셔너리
+    """
+    results = {}
+    for name, build in variants.items():
+        logger.info(f"Evaluating {name}")
+        results[name] = evaluate_generator(build(), num_samples=num_samples, seed=seed)
+
+    reference = reference or next(iter(results))
+    for name, result in results.items():
+        result["source_agreement"] = source_agreement(results[reference], result)
+
+    for result in results.values():
+        result.pop("compositions")
+
+    return results
+
+
+def format_report(results: Dict[str, Dict]) -> str:
+    """비교 결과를 표 형태 문자열로 변환"""
+    columns = [
+        ("model_size_mb", "size(MB)"),
+        ("latency_ms_mean", "lat mean(ms)"),
+        ("latency_ms_p95", "lat p95(ms)"),
+        ("musicality_score", "musicality"),
+        ("diversity_score", "diversity"),
+        ("source_agreement", "agreement")
+    ]
+
+    lines = ["variant".ljust(10) + "".join(title.rjust(14) for _, title in columns)]
+    for name, result in results.items():
+        lines.append(name.ljust(10) + "".join(f"{result[key]:14.3f}" for key, _ in columns))
+
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--checkpoint", type=str, required=True)
+    parser.add_argument("--num-samples", type=int, default=32)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--student", type=str, default=None, help="distillation student 체크포인트 (함께 비교)")
+    parser.add_argument("--output", type=str, default=None, help="JSON 결과 저장 경로")
+
+    args = parser.parse_args()
+
+    variants = {
+        "fp32": lambda: CompositionGenerator.load(args.checkpoint),
+        "int8": lambda: CompositionGenerator.load(args.checkpoint, quantize="int8")
+    }
+    if args.student:
+        variants["student"] = lambda: CompositionGenerator.load(args.student)
+        variants["stud-int8"] = lambda: CompositionGenerator.load(args.student, quantize="int8")
+
+    results = compare_generators(
+        variants,
+        num_samples=args.num_samples,
+        seed=args.seed
+    )
+
+    print(format_report(results))
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
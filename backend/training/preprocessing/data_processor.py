@@ -1,16 +1,125 @@
 """
 학습 데이터 전처리 파이프라인
 """
+import time
 import torch
-from torch.utils.data import Dataset, DataLoader
-from typing import List, Dict, Tuple
+from torch.utils.data import Dataset, DataLoader, Sampler
+from typing import AsyncIterator, Callable, Iterator, List, Dict, Optional, Tuple, Union
 import numpy as np
+from bson import ObjectId
 from loguru import logger
 
 
+def collate_batch(batch: Dict[str, torch.Tensor]) -> Dict[str, torch.Tensor]:
+    """__getitems__가 이미 배치 텐서를 반환하므로 그대로 전달하는 collate_fn"""
+    return batch
+
+
+BatchTransform = Callable[[Dict[str, torch.Tensor], torch.Tensor], Dict[str, torch.Tensor]]
+
+
+def flip_x(batch: Dict[str, torch.Tensor], rows: torch.Tensor) -> Dict[str, torch.Tensor]:
+    """선택된 composition 좌우 반전 (x → 1 - x, 패딩 위치는 0 유지)"""
+    positions = batch['positions']
+    flip = rows[:, None, None] & batch['mask']
+    x = torch.where(flip, 1.0 - positions[..., 0], positions[..., 0])
+    batch['positions'] = torch.stack([x, positions[..., 1]], dim=-1)
+    return batch
+
+
+def vary_volume(
+    batch: Dict[str, torch.Tensor],
+    rows: torch.Tensor,
+    variance: float = 0.1
+) -> Dict[str, torch.Tensor]:
+    """선택된 composition의 소스별 볼륨을 (1 ± variance)배 후 [0, 1]로 clip"""
+    volumes = batch['volumes']
+    factor = 1.0 + (torch.rand_like(volumes) * 2 - 1) * variance
+    varied = torch.clamp(volumes * factor, 0.0, 1.0)
+    batch['volumes'] = torch.where(rows[:, None, None] & batch['mask'], varied, volumes)
+    return batch
+
+
+class BatchAugmentation:
+    """
+    학습 배치에 즉석으로 적용하는 데이터 증강 (train DataLoader의 collate_fn)
+
+    변환마다 composition별로 확률 p로 적용 여부를 뽑으므로 에폭마다 다른 증강을 보고,
+    증강된 복사본을 미리 만들지 않아 메모리는 원본 배열 하나만 사용한다.
+    """
+
+    def __init__(self, transforms: Optional[List[Tuple[BatchTransform, float]]] = None):
+        """
+        Args:
+            transforms: (변환 함수, 적용 확률) 리스트 (None이면 좌우 반전 0.5 + 볼륨 변화 0.5)
+                변환 함수는 (batch, rows) → batch, rows는 적용할 composition의 (batch,) bool 텐서
+        """
+        self.transforms = transforms if transforms is not None else [(flip_x, 0.5), (vary_volume, 0.5)]
+
+    def __call__(self, batch: Dict[str, torch.Tensor]) -> Dict[str, torch.Tensor]:
+        batch_size = batch['source_ids'].shape[0]
+        for transform, probability in self.transforms:
+            rows = torch.rand(batch_size) < probability
+            if rows.any():
+                batch = transform(batch, rows)
+        return batch
+
+
+class BucketBatchSampler(Sampler[List[int]]):
+    """
+    소스 밀도(씬당 최대 소스 수)가 비슷한 composition끼리 배치를 구성
+
+    무작위 순서를 bucket_size 배치 분량씩 나눠 각 묶음 안에서 너비순으로 정렬한 뒤 배치로 자르고,
+    배치 순서를 다시 섞는다. 배치가 가장 넓은 composition 너비까지만 패딩되므로 패딩 토큰이 줄어든다.
+    """
+
+    def __init__(self, widths: np.ndarray, batch_size: int, shuffle: bool = True, bucket_size: int = 50):
+        """
+        Args:
+            widths: composition별 너비 (CompositionDataset.widths())
+            batch_size: 배치 크기
+            shuffle: False면 전체를 너비순으로 정렬한 고정 배치 (검증용)
+            bucket_size: 정렬 단위 (배치 개수)
+        """
+        self.widths = np.asarray(widths)
+        self.batch_size = batch_size
+        self.shuffle = shuffle
+        self.bucket_size = bucket_size
+
+    def __iter__(self) -> Iterator[List[int]]:
+        if not self.shuffle:
+            order = np.argsort(self.widths, kind='stable')
+            for start in range(0, len(order), self.batch_size):
+                yield order[start:start + self.batch_size].tolist()
+            return
+
+        order = np.random.permutation(len(self.widths))
+        chunk = self.batch_size * self.bucket_size
+
+        batches = []
+        for start in range(0, len(order), chunk):
+            bucket = order[start:start + chunk]
+            bucket = bucket[np.argsort(self.widths[bucket], kind='stable')]
+            batches.extend(bucket[i:i + self.batch_size] for i in range(0, len(bucket), self.batch_size))
+
+        for batch_idx in np.random.permutation(len(batches)):
+            yield batches[batch_idx].tolist()
+
+    def __len__(self) -> int:
+        return (len(self.widths) + self.batch_size - 1) // self.batch_size
+
+
 class CompositionDataset(Dataset):
     """
     Composition 데이터셋 클래스
+
+    생성 시 전체 composition을 한 번만 인코딩해 연속 배열로 보관한다.
+        - source_ids: (N, num_scenes, max_sources) int64, 빈 위치는 PAD (num_sources)
+        - positions: (N, num_scenes, max_sources, 2) float32, 0~1 정규화
+        - volumes: (N, num_scenes, max_sources) float32
+        - mask: (N, num_scenes, max_sources) bool, 유효한 소스 위치
+    __getitem__은 배열 슬라이스, __getitems__는 배치 전체를 한 번의 fancy index로 반환한다.
+    __getitems__는 소스 축을 배치에서 가장 넓은 composition까지만 잘라 반환한다 (동적 패딩).
     """
 
     def __init__(
@@ -18,7 +127,9 @@ class CompositionDataset(Dataset):
         compositions: List[Dict],
         pack: str,
         max_sources_per_scene: int = 20,
-        num_scenes: int = 16
+        num_scenes: int = 16,
+        arrays: Optional[Dict[str, np.ndarray]] = None,
+        indices: Optional[np.ndarray] = None
     ):
         """
         Args:
@@ -26,8 +137,9 @@ class CompositionDataset(Dataset):
             pack: 팩 종류
             max_sources_per_scene: 씬당 최대 소스 개수
             num_scenes: 씬 개수 (기본 16)
+            arrays: 이미 인코딩된 배열 (주어지면 compositions 대신 사용, 복사하지 않음)
+            indices: 사용할 행 (None이면 전체) - memory map 배열을 복사하지 않고 분할할 때 사용
         """
-        self.compositions = compositions
         self.pack = pack
         self.max_sources_per_scene = max_sources_per_scene
         self.num_scenes = num_scenes
@@ -36,7 +148,77 @@ class CompositionDataset(Dataset):
         self.source_to_idx = self._build_source_mapping(pack)
         self.num_sources = len(self.source_to_idx)
 
-        logger.info(f"Created dataset for {pack} with {len(compositions)} compositions")
+        self.arrays = arrays if arrays is not None else self.encode(compositions)
+        self.indices = indices
+        self._row_widths: Optional[np.ndarray] = None  # 전체 배열 행별 너비 (subset과 공유)
+
+        logger.info(f"Created dataset for {pack} with {len(self)} compositions")
+
+    def empty_arrays(self, count: int) -> Dict[str, np.ndarray]:
+        """count개 composition을 담을 빈 (PAD로 채운) 배열"""
+        shape = (count, self.num_scenes, self.max_sources_per_scene)
+        return {
+            'source_ids': np.full(shape, self.num_sources, dtype=np.int64),  # PAD token
+            'positions': np.zeros(shape + (2,), dtype=np.float32),
+            'volumes': np.zeros(shape, dtype=np.float32),
+            'mask': np.zeros(shape, dtype=bool)
+        }
+
+    def encode(
+        self,
+        compositions: List[Dict],
+        out: Optional[Dict[str, np.ndarray]] = None
+    ) -> Dict[str, np.ndarray]:
+        """
+        composition 리스트를 배열로 인코딩
+
+        소스를 한 번 순회하며 좌표/값을 평평한 리스트로 모은 뒤 fancy index로 한 번에 채운다.
+        모르는 소스는 건너뛰고 (해당 위치는 PAD), 범위를 넘는 씬/소스는 버린다.
+
+        Args:
+            compositions: composition 리스트
+            out: 결과를 채울 PAD 배열 (empty_arrays()의 행 slice 등, None이면 새로 할당)
+
+        Returns:
+            'source_ids', 'positions', 'volumes', 'mask' 배열 딕셔너리 (out이 있으면 out)
+        """
+        arrays = out if out is not None else self.empty_arrays(len(compositions))
+
+        comp_idx, scene_idx, slot_idx = [], [], []
+        source_ids, xs, ys, volumes = [], [], [], []
+
+        for comp_id, composition in enumerate(compositions):
+            for scene in composition['scenes']:
+                scene_id = scene['id']
+                if scene_id >= self.num_scenes:
+                    continue
+
+                placed_sources = scene.get('placedSources', [])
+
+                for src_idx, source in enumerate(placed_sources[:self.max_sources_per_scene]):
+                    idx = self.source_to_idx.get(source['sourceId'])
+                    if idx is None:
+                        continue
+
+                    comp_idx.append(comp_id)
+                    scene_idx.append(scene_id)
+                    slot_idx.append(src_idx)
+                    source_ids.append(idx)
+                    xs.append(source.get('x', 500))
+                    ys.append(source.get('y', 300))
+                    volumes.append(source.get('volume', 1.0))
+
+        index = tuple(np.array(values, dtype=np.int64) for values in (comp_idx, scene_idx, slot_idx))
+        arrays['source_ids'][index] = source_ids
+        # 위치 정규화 (0~1 범위로, 캔버스 너비 1000, 높이 600)
+        # float64로 나눈 뒤 저장할 때 한 번만 float32로 반올림 (composition별 텐서 인코딩과 같은 값)
+        arrays['positions'][index] = np.stack(
+            [np.array(xs, dtype=np.float64) / 1000.0, np.array(ys, dtype=np.float64) / 600.0], axis=-1
+        )
+        arrays['volumes'][index] = volumes
+        arrays['mask'][index] = True
+
+        return arrays
 
     def _build_source_mapping(self, pack: str) -> Dict[str, int]:
         """팩별 소스 ID → 인덱스 매핑"""
@@ -93,12 +275,37 @@ class CompositionDataset(Dataset):
 
         return mapping
 
+    def subset(self, indices: np.ndarray) -> "CompositionDataset":
+        """같은 배열의 일부 행만 사용하는 데이터셋 (배열을 복사하지 않음)"""
+        if self.indices is not None:
+            indices = self.indices[indices]
+        dataset = CompositionDataset(
+            [], self.pack, self.max_sources_per_scene, self.num_scenes, arrays=self.arrays, indices=indices
+        )
+        dataset._row_widths = self._all_widths()
+        return dataset
+
+    def _all_widths(self) -> np.ndarray:
+        """전체 배열 행별 너비: 유효한 소스가 있는 마지막 위치 + 1 (최소 1)"""
+        if self._row_widths is None:
+            occupied = np.asarray(self.arrays['mask']).any(axis=1)  # (N, max_sources)
+            last = self.max_sources_per_scene - np.argmax(occupied[:, ::-1], axis=1)
+            self._row_widths = np.where(occupied.any(axis=1), last, 1).astype(np.int64)
+        return self._row_widths
+
+    def widths(self) -> np.ndarray:
+        """composition별 너비 (이 데이터셋의 행 순서, 버킷팅/동적 패딩 기준)"""
+        widths = self._all_widths()
+        return widths if self.indices is None else widths[self.indices]
+
     def __len__(self) -> int:
-        return len(self.compositions)
+        if self.indices is not None:
+            return len(self.indices)
+        return len(self.arrays['source_ids'])
 
     def __getitem__(self, idx: int) -> Dict[str, torch.Tensor]:
         """
-        하나의 composition을 텐서로 변환
+        하나의 composition 텐서 (인코딩된 배열의 뷰)
 
         Returns:
             {
@@ -108,50 +315,24 @@ class CompositionDataset(Dataset):
                 'mask': (num_scenes, max_sources)  # 유효한 소스 위치 표시
             }
         """
-        composition = self.compositions[idx]
+        if self.indices is not None:
+            idx = self.indices[idx]
+        return {key: torch.from_numpy(np.asarray(array[idx])) for key, array in self.arrays.items()}
 
-        # 초기화
-        source_ids = torch.full(
-            (self.num_scenes, self.max_sources_per_scene),
-            self.num_sources,  # PAD token
-            dtype=torch.long
-        )
-        positions = torch.zeros((self.num_scenes, self.max_sources_per_scene, 2))
-        volumes = torch.zeros((self.num_scenes, self.max_sources_per_scene))
-        mask = torch.zeros((self.num_scenes, self.max_sources_per_scene), dtype=torch.bool)
-
-        # 각 씬 처리
-        for scene in composition['scenes']:
-            scene_id = scene['id']
-            if scene_id >= self.num_scenes:
-                continue
-
-            placed_sources = scene.get('placedSources', [])
-
-            for src_idx, source in enumerate(placed_sources[:self.max_sources_per_scene]):
-                source_name = source['sourceId']
-
-                # 소스 ID 변환
-                if source_name in self.source_to_idx:
-                    source_ids[scene_id, src_idx] = self.source_to_idx[source_name]
+    def __getitems__(self, indices: List[int]) -> Dict[str, torch.Tensor]:
+        """
+        배치 전체를 한 번의 fancy index로 가져옴 (DataLoader는 collate_fn=collate_batch로 사용)
 
-                    # 위치 정규화 (0~1 범위로)
-                    x = source.get('x', 500) / 1000.0  # 캔버스 너비 1000
-                    y = source.get('y', 300) / 600.0   # 캔버스 높이 600
-                    positions[scene_id, src_idx] = torch.tensor([x, y])
+        Returns:
+            __getitem__과 같은 키, 각 (batch, num_scenes, width, ...) 텐서
+        """
+        indices = np.asarray(indices, dtype=np.int64)
+        if self.indices is not None:
+            indices = self.indices[indices]
 
-                    # 볼륨
-                    volumes[scene_id, src_idx] = source.get('volume', 1.0)
-
-                    # 마스크 (유효한 소스)
-                    mask[scene_id, src_idx] = True
-
-        return {
-            'source_ids': source_ids,
-            'positions': positions,
-            'volumes': volumes,
-            'mask': mask
-        }
+        # 배치에서 가장 넓은 composition까지만 (필요한 열만 읽음)
+        width = int(self._all_widths()[indices].max()) if len(indices) else self.max_sources_per_scene
+        return {key: torch.from_numpy(array[indices, :, :width]) for key, array in self.arrays.items()}
 
 
 class DataProcessor:
@@ -179,131 +360,250 @@ class DataProcessor:
         Returns:
             composition 리스트
         """
-        from api.schemas.composition import Composition
-
-        # 해당 팩의 사용자 생성 composition만 가져오기
-        compositions = await Composition.find({
-            "pack": self.pack,
-            "is_ai_generated": False
-        }).to_list()
+        compositions = []
+        async for chunk in self._stream_compositions(db):
+            compositions.extend(chunk)
 
         logger.info(f"Loaded {len(compositions)} compositions for {self.pack}")
 
-        # Dict 형태로 변환
-        composition_dicts = []
-        for comp in compositions:
-            composition_dicts.append({
-                'pack': comp.pack,
-                'scenes': [scene.dict() for scene in comp.scenes]
-            })
+        return compositions
 
-        return composition_dicts
-
-    def create_dataloader(
+    async def _stream_compositions(
         self,
-        compositions: List[Dict],
-        shuffle: bool = True,
-        train_split: float = 0.8
-    ) -> Tuple[DataLoader, DataLoader]:
+        db,
+        query: Optional[Dict] = None,
+        chunk_size: int = 1000,
+        on_progress: Optional[Callable[[int, int], None]] = None,
+        total: Optional[int] = None
+    ) -> AsyncIterator[List[Dict]]:
         """
-        Train/Validation DataLoader 생성
+        해당 팩의 사용자 생성 composition을 _id(삽입 순서) 오름차순으로 chunk 단위 스트리밍
+
+        Beanie 모델 대신 motor 커서로 학습에 필요한 필드만 projection해서 읽으므로
+        메모리에는 한 chunk의 raw 문서만 올라온다.
 
         Args:
-            compositions: composition 데이터
-            shuffle: 셔플 여부
-            train_split: 학습 데이터 비율
+            db: MongoDB 데이터베이스 인스턴스
+            query: 추가 필터 (예: _id 워터마크)
+            chunk_size: chunk당 문서 수 (커서 batch_size와 같음)
+            on_progress: (읽은 수, 전체 수) 콜백 (None이면 로그만)
+            total: 이미 센 전체 문서 수 (None이면 count_documents로 셈)
 
-        Returns:
-            (train_loader, val_loader)
+        Yields:
+            [{'id', 'scenes': [{'id', 'placedSources': [{'sourceId', 'x', 'y', 'volume'}]}]}, ...]
         """
-        # Train/Val 분할
-        split_idx = int(len(compositions) * train_split)
+        from api.schemas.composition import Composition
 
-        if shuffle:
-            np.random.shuffle(compositions)
+        collection = db[Composition.Settings.name]
+        query = {**self._base_query(), **(query or {})}
+        projection = {
+            "scenes.id": 1,
+            "scenes.placedSources.sourceId": 1,
+            "scenes.placedSources.x": 1,
+            "scenes.placedSources.y": 1,
+            "scenes.placedSources.volume": 1
+        }
 
-        train_data = compositions[:split_idx]
-        val_data = compositions[split_idx:]
+        if total is None:
+            total = await collection.count_documents(query)
+        cursor = collection.find(query, projection).sort("_id", 1).batch_size(chunk_size)
 
-        logger.info(f"Train: {len(train_data)}, Val: {len(val_data)}")
+        loaded = 0
+        chunk = []
+        start = time.perf_counter()
 
-        # Dataset 생성
-        train_dataset = CompositionDataset(
-            train_data,
-            self.pack,
-            self.max_sources_per_scene
-        )
+        async for document in cursor:
+            document['id'] = str(document.pop('_id'))
+            chunk.append(document)
 
-        val_dataset = CompositionDataset(
-            val_data,
-            self.pack,
-            self.max_sources_per_scene
-        )
+            if len(chunk) == chunk_size:
+                loaded += len(chunk)
+                self._report_progress(loaded, total, start, on_progress)
+                yield chunk
+                chunk = []
 
-        # DataLoader 생성
-        train_loader = DataLoader(
-            train_dataset,
-            batch_size=self.batch_size,
-            shuffle=True,
-            num_workers=0  # 비동기 작업이므로 0
-        )
+        if chunk:
+            loaded += len(chunk)
+            self._report_progress(loaded, total, start, on_progress)
+            yield chunk
 
-        val_loader = DataLoader(
-            val_dataset,
-            batch_size=self.batch_size,
-            shuffle=False,
-            num_workers=0
-        )
+    def _base_query(self) -> Dict:
+        """학습에 쓰는 composition 필터 (해당 팩의 사용자 생성 composition)"""
+        return {"pack": self.pack, "is_ai_generated": False}
 
-        return train_loader, val_loader
+    async def _cache_matches(self, db, cache, chunk_size: int = 1000) -> bool:
+        """
+        캐시가 워터마크까지의 DB 상태와 같은지 확인
+
+        워터마크 이하 _id의 문서 수와 _id 목록을 캐시와 비교하므로 캐시 이후 삭제된 composition이나
+        워터마크보다 작은 _id로 늦게 삽입된 composition이 있으면 False.
 
-    def augment_data(self, composition: Dict) -> List[Dict]:
+        Args:
+            db: MongoDB 데이터베이스 인스턴스
+            cache: TensorCache
+            chunk_size: _id 커서 batch_size
+
+        Returns:
+            캐시를 그대로 이어서 쓸 수 있는지 여부
         """
-        데이터 증강 (Data Augmentation)
+        from api.schemas.composition import Composition
+
+        collection = db[Composition.Settings.name]
+        query = {**self._base_query(), "_id": {"$lte": ObjectId(cache.watermark)}}
 
-        - 위치 변환 (translation)
-        - 소스 순서 섞기
-        - 볼륨 변화
+        if await collection.count_documents(query) != cache.count:
+            return False
+
+        cached_ids = cache.ids()
+        index = 0
+        cursor = collection.find(query, {"_id": 1}).sort("_id", 1).batch_size(chunk_size)
+        async for document in cursor:
+            if index >= cache.count or document['_id'].binary != cached_ids[index].tobytes():
+                return False
+            index += 1
+
+        return index == cache.count
+
+    def _report_progress(
+        self,
+        loaded: int,
+        total: int,
+        start: float,
+        on_progress: Optional[Callable[[int, int], None]]
+    ):
+        """스트리밍 로드 진행 상황"""
+        elapsed = time.perf_counter() - start
+        logger.info(
+            f"Loaded {loaded}/{total} compositions for {self.pack} "
+            f"({loaded / max(total, 1):.0%}, {loaded / max(elapsed, 1e-9):.0f} docs/s)"
+        )
+        if on_progress is not None:
+            on_progress(loaded, total)
+
+    async def load_arrays(
+        self,
+        db,
+        cache_dir: Optional[str] = None,
+        chunk_size: int = 1000,
+        on_progress: Optional[Callable[[int, int], None]] = None
+    ) -> Dict[str, np.ndarray]:
+        """
+        MongoDB 문서를 스트리밍하며 바로 학습 배열로 인코딩
+
+        cache_dir이 주어지면 캐시 워터마크(_id) 이후에 삽입된 composition만 가져와 chunk마다 캐시에 append하고
+        배열을 memory map으로 로드한다. 워터마크까지의 문서 수나 _id 목록이 캐시와 다르면
+        (삭제, 늦은 삽입) 캐시를 비우고 다시 만든다. 없으면 먼저 문서 수를 세어 배열을 한 번 할당하고
+        chunk마다 해당 행에 바로 인코딩한다 (최대 메모리는 결과 배열 1벌 + chunk 하나).
 
         Args:
-            composition: 원본 composition
+            db: MongoDB 데이터베이스 인스턴스
+            cache_dir: 캐시 루트 디렉토리 ({cache_dir}/{pack}/, None이나 빈 문자열이면 캐시 없이 전체 로드)
+            chunk_size: 한 번에 읽어 인코딩할 문서 수
+            on_progress: (읽은 수, 전체 수) 콜백
 
         Returns:
-            증강된 composition 리스트
+            'source_ids', 'positions', 'volumes', 'mask' 배열
         """
-        augmented = [composition]  # 원본 포함
+        encoder = CompositionDataset([], self.pack, self.max_sources_per_scene)
+
+        if not cache_dir:
+            from api.schemas.composition import Composition
+
+            total = await db[Composition.Settings.name].count_documents(self._base_query())
+            arrays = encoder.empty_arrays(total)
+            filled = 0
+
+            async for documents in self._stream_compositions(
+                db, chunk_size=chunk_size, on_progress=on_progress, total=total
+            ):
+                end = filled + len(documents)
+                if end > len(arrays['source_ids']):
+                    # 세어 본 뒤 삽입된 composition - 드문 경우라 이때만 늘림
+                    logger.warning(f"Compositions for {self.pack} grew while loading, resizing arrays to {end}")
+                    extra = encoder.empty_arrays(end - len(arrays['source_ids']))
+                    arrays = {key: np.concatenate([arrays[key], extra[key]]) for key in arrays}
 
-        # 1. 위치 변환 (좌우 반전)
-        flipped = self._flip_composition(composition)
-        augmented.append(flipped)
+                encoder.encode(documents, out={key: value[filled:end] for key, value in arrays.items()})
+                filled = end
 
-        # 2. 볼륨 변화 (+/- 10%)
-        volume_varied = self._vary_volume(composition)
-        augmented.append(volume_varied)
+            # 세어 본 뒤 삭제된 composition만큼 남은 PAD 행 제외
+            return {key: value[:filled] for key, value in arrays.items()}
 
-        return augmented
+        from training.preprocessing.tensor_cache import TensorCache
 
-    def _flip_composition(self, composition: Dict) -> Dict:
-        """좌우 반전"""
-        import copy
-        flipped = copy.deepcopy(composition)
+        cache = TensorCache(cache_dir, self.pack, max_sources_per_scene=self.max_sources_per_scene)
 
-        for scene in flipped['scenes']:
-            for source in scene.get('placedSources', []):
-                # X 좌표 반전
-                source['x'] = 1000 - source['x']
+        if cache.watermark is not None and not await self._cache_matches(db, cache, chunk_size):
+            logger.warning(
+                f"Training cache for {self.pack} diverged from MongoDB "
+                f"(deleted or late-inserted compositions), rebuilding {cache.path}"
+            )
+            cache.reset()
 
-        return flipped
+        query = {}
+        if cache.watermark is not None:
+            query = {"_id": {"$gt": ObjectId(cache.watermark)}}
+
+        previous_watermark = cache.watermark
+        previous_count = cache.count
+
+        # chunk마다 append하고 워터마크를 옮기므로 중단되어도 다음 실행에서 이어서 로드
+        async for documents in self._stream_compositions(db, query, chunk_size, on_progress):
+            cache.append(encoder.encode(documents), [doc['id'] for doc in documents])
+
+        logger.info(
+            f"Loaded {cache.count} compositions for {self.pack} from training cache "
+            f"({cache.count - previous_count} new since {previous_watermark})"
+        )
 
-    def _vary_volume(self, composition: Dict, variance: float = 0.1) -> Dict:
-        """볼륨 변화"""
-        import copy
-        varied = copy.deepcopy(composition)
+        return cache.load()
 
-        for scene in varied['scenes']:
-            for source in scene.get('placedSources', []):
-                # 볼륨 변화 (0.9~1.1배)
-                factor = np.random.uniform(1 - variance, 1 + variance)
-                source['volume'] = np.clip(source['volume'] * factor, 0.0, 1.0)
+    def create_dataloader(
+        self,
+        compositions: Union[List[Dict], Dict[str, np.ndarray]],
+        shuffle: bool = True,
+        train_split: float = 0.8,
+        augmentation: Optional[BatchAugmentation] = None
+    ) -> Tuple[DataLoader, DataLoader]:
+        """
+        Train/Validation DataLoader 생성
 
-        return varied
+        Args:
+            compositions: composition 데이터 또는 인코딩된 배열 (load_arrays() 결과)
+            shuffle: 셔플 여부
+            train_split: 학습 데이터 비율
+            augmentation: train 배치에 적용할 증강 (None이면 증강 없음, 검증 배치에는 적용하지 않음)
+
+        Returns:
+            (train_loader, val_loader)
+        """
+        if isinstance(compositions, dict):
+            dataset = CompositionDataset([], self.pack, self.max_sources_per_scene, arrays=compositions)
+        else:
+            dataset = CompositionDataset(compositions, self.pack, self.max_sources_per_scene)
+
+        # Train/Val 분할 (행 인덱스만 나누므로 배열은 복사되지 않음)
+        split_idx = int(len(dataset) * train_split)
+        order = np.random.permutation(len(dataset)) if shuffle else np.arange(len(dataset))
+
+        train_dataset = dataset.subset(order[:split_idx])
+        val_dataset = dataset.subset(order[split_idx:])
+
+        logger.info(f"Train: {len(train_dataset)}, Val: {len(val_dataset)}")
+
+        # DataLoader 생성 (너비가 비슷한 composition끼리 배치, 배치별 동적 패딩)
+        train_loader = DataLoader(
+            train_dataset,
+            batch_sampler=BucketBatchSampler(train_dataset.widths(), self.batch_size, shuffle=shuffle),
+            num_workers=0,  # 비동기 작업이므로 0
+            collate_fn=augmentation or collate_batch
+        )
+
+        val_loader = DataLoader(
+            val_dataset,
+            batch_sampler=BucketBatchSampler(val_dataset.widths(), self.batch_size, shuffle=False),
+            num_workers=0,
+            collate_fn=collate_batch
+        )
+
+        return train_loader, val_loader
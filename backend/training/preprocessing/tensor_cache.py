@@ -0,0 +1,192 @@
+"""
+팩별 학습 배열 디스크 캐시 (memory-mapped 컬럼 + _id 워터마크)
+"""
+import json
+import os
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from loguru import logger
+
+CACHE_FORMAT_VERSION = 2
+OBJECT_ID_BYTES = 12
+
+
+class TensorCache:
+    """
+    CompositionDataset 배열을 컬럼별 raw 파일로 저장하고 memory map으로 읽는 캐시
+
+    디렉토리 구조 ({cache_dir}/{pack}/):
+        - source_ids.bin, positions.bin, volumes.bin, mask.bin: 행(composition) 단위로 이어 붙인 배열
+        - ids.bin: 행별 composition _id (ObjectId 12바이트, _id 오름차순) - DB와 비교해 삭제/늦은 삽입 감지
+        - meta.json: 행 수, 배열 구조, 워터마크 (포함된 composition의 최대 _id)
+
+    새 composition은 파일 끝에 append하고 meta.json을 원자적으로 교체한다.
+    meta.json의 행 수만 유효하므로 append 도중 중단되어도 다음 append에서 남은 바이트를 잘라낸다.
+    """
+
+    COLUMNS = ("source_ids", "positions", "volumes", "mask")
+    IDS = "ids"
+
+    def __init__(
+        self,
+        cache_dir: str,
+        pack: str,
+        num_scenes: int = 16,
+        max_sources_per_scene: int = 20
+    ):
+        """
+        Args:
+            cache_dir: 캐시 루트 디렉토리
+            pack: 팩 종류
+            num_scenes: 씬 개수
+            max_sources_per_scene: 씬당 최대 소스 개수
+        """
+        self.path = os.path.join(cache_dir, pack)
+        self.pack = pack
+
+        # 컬럼 → (dtype, 행 shape)
+        row = (num_scenes, max_sources_per_scene)
+        self.layout: Dict[str, Tuple[str, Tuple[int, ...]]] = {
+            "source_ids": ("int64", row),
+            "positions": ("float32", row + (2,)),
+            "volumes": ("float32", row),
+            "mask": ("bool", row)
+        }
+
+        os.makedirs(self.path, exist_ok=True)
+        self.meta = self._read_meta()
+
+    def _meta_path(self) -> str:
+        return os.path.join(self.path, "meta.json")
+
+    def _column_path(self, column: str) -> str:
+        return os.path.join(self.path, f"{column}.bin")
+
+    def _row_bytes(self, column: str) -> int:
+        if column == self.IDS:
+            return OBJECT_ID_BYTES
+        dtype, shape = self.layout[column]
+        return np.dtype(dtype).itemsize * int(np.prod(shape))
+
+    def _read_meta(self) -> Dict:
+        """meta.json 읽기 (없거나 배열 구조가 다르면 빈 캐시)"""
+        empty = {
+            "version": CACHE_FORMAT_VERSION,
+            "count": 0,
+            "layout": {column: [dtype, list(shape)] for column, (dtype, shape) in self.layout.items()},
+            "watermark": None
+        }
+
+        if not os.path.exists(self._meta_path()):
+            return empty
+
+        with open(self._meta_path()) as f:
+            meta = json.load(f)
+
+        if meta.get("version") != CACHE_FORMAT_VERSION or meta.get("layout") != empty["layout"]:
+            logger.warning(f"Training cache layout changed for {self.pack}, rebuilding {self.path}")
+            return empty
+
+        return meta
+
+    def _write_meta(self, meta: Dict):
+        """meta.json 원자적 교체"""
+        tmp_path = self._meta_path() + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(meta, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self._meta_path())
+        self.meta = meta
+
+    @property
+    def count(self) -> int:
+        """캐시된 composition 수"""
+        return self.meta["count"]
+
+    @property
+    def watermark(self) -> Optional[str]:
+        """캐시에 포함된 composition의 최대 _id (hex, 비어 있으면 None)"""
+        return self.meta["watermark"]
+
+    def ids(self) -> np.ndarray:
+        """
+        캐시 행별 composition _id
+
+        Returns:
+            (count, 12) uint8 - ObjectId 바이너리, 캐시 행 순서 (_id 오름차순)
+        """
+        if self.count == 0:
+            return np.zeros((0, OBJECT_ID_BYTES), dtype=np.uint8)
+        return np.memmap(
+            self._column_path(self.IDS), dtype=np.uint8, mode="r", shape=(self.count, OBJECT_ID_BYTES)
+        )
+
+    def load(self) -> Dict[str, np.ndarray]:
+        """
+        캐시 배열을 memory map으로 열기 (읽을 때만 페이지를 올리므로 RAM보다 큰 캐시도 사용 가능)
+
+        copy-on-write로 열어 torch.from_numpy로 그대로 쓸 수 있고, 수정해도 파일은 바뀌지 않는다.
+
+        Returns:
+            'source_ids', 'positions', 'volumes', 'mask' 배열 딕셔너리, 각 (count, ...)
+        """
+        arrays = {}
+        for column, (dtype, shape) in self.layout.items():
+            if self.count == 0:
+                arrays[column] = np.zeros((0,) + shape, dtype=dtype)
+            else:
+                arrays[column] = np.memmap(
+                    self._column_path(column), dtype=dtype, mode="c", shape=(self.count,) + shape
+                )
+
+        return arrays
+
+    def append(self, arrays: Dict[str, np.ndarray], ids: List[str]):
+        """
+        새 composition 배열을 캐시 끝에 추가
+
+        Args:
+            arrays: CompositionDataset.encode() 결과 (_id 오름차순)
+            ids: 행별 composition _id (hex, 마지막 값이 새 워터마크)
+        """
+        num_rows = len(arrays["source_ids"])
+        if num_rows == 0:
+            return
+        if len(ids) != num_rows:
+            raise ValueError(f"Expected {num_rows} ids, got {len(ids)}")
+
+        columns = {}
+        for column, (dtype, shape) in self.layout.items():
+            values = np.ascontiguousarray(arrays[column], dtype=dtype)
+            if values.shape[1:] != shape:
+                raise ValueError(f"Unexpected {column} shape {values.shape}, expected (N, {shape})")
+            columns[column] = values
+        columns[self.IDS] = np.frombuffer(b"".join(bytes.fromhex(doc_id) for doc_id in ids), dtype=np.uint8)
+
+        for column, values in columns.items():
+            path = self._column_path(column)
+            with open(path, "r+b" if os.path.exists(path) else "w+b") as f:
+                # 커밋되지 않은 이전 append의 잔여 바이트 제거
+                f.truncate(self.count * self._row_bytes(column))
+                f.seek(0, os.SEEK_END)
+                f.write(values.tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+
+        self._write_meta({
+            **self.meta,
+            "count": self.count + num_rows,
+            "watermark": ids[-1]
+        })
+
+        logger.info(f"Appended {num_rows} compositions to training cache {self.path} (total {self.count})")
+
+    def reset(self):
+        """캐시 비우기"""
+        for column in self.COLUMNS + (self.IDS,):
+            if os.path.exists(self._column_path(column)):
+                os.remove(self._column_path(column))
+        if os.path.exists(self._meta_path()):
+            os.remove(self._meta_path())
+        self.meta = self._read_meta()
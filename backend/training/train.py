@@ -3,6 +3,7 @@
 """
 import torch
 import torch.nn as nn
+import torch.nn.functional as F
 import torch.optim as optim
 from torch.utils.data import DataLoader
 from typing import Dict, Optional
@@ -12,7 +13,7 @@ from loguru import logger
 import asyncio
 
 from models.transformer.composition_generator import CompositionTransformer, CompositionGenerator
-from training.preprocessing.data_processor import DataProcessor
+from training.preprocessing.data_processor import BatchAugmentation, DataProcessor
 from training.evaluation.metrics import CompositionMetrics
 from api.database import connect_to_mongo, get_database
 
@@ -46,9 +47,9 @@ class CompositionLoss(nn.Module):
         Returns:
             손실 딕셔너리
         """
-        # 소스 ID 분류 손실
+        # 소스 ID 분류 손실 (패딩 위치는 ignore_index)
         source_logits = predictions['source_logits']
-        target_sources = targets['source_ids']
+        target_sources = targets['source_ids'].masked_fill(~targets['mask'], -100)
 
         # Reshape for cross entropy
         batch_size, seq_len, num_classes = source_logits.shape
@@ -57,15 +58,15 @@ class CompositionLoss(nn.Module):
 
         source_loss = self.ce_loss(source_logits, target_sources)
 
-        # 위치 회귀 손실 (유효한 소스만)
-        mask = targets['mask']
+        # 위치 회귀 손실 (유효한 소스만, 예측과 같이 씬을 펼친 순서)
+        mask = targets['mask'].reshape(batch_size, -1)
         pred_positions = predictions['positions'][mask]
-        target_positions = targets['positions'][mask]
+        target_positions = targets['positions'].reshape(batch_size, -1, 2)[mask]
         position_loss = self.mse_loss(pred_positions, target_positions)
 
         # 볼륨 회귀 손실
         pred_volumes = predictions['volumes'][mask]
-        target_volumes = targets['volumes'][mask].unsqueeze(-1)
+        target_volumes = targets['volumes'].reshape(batch_size, -1)[mask].unsqueeze(-1)
         volume_loss = self.mse_loss(pred_volumes, target_volumes)
 
         # 총 손실
@@ -161,8 +162,9 @@ class Trainer:
                 'mask': batch['mask'].to(self.device)
             }
 
-            # Forward
-            predictions = self.model(composition_data)
+            # Forward (패딩 위치는 attention에서 제외)
+            padding_mask = ~targets['mask'].reshape(targets['mask'].shape[0], -1)
+            predictions = self.model(composition_data, padding_mask)
 
             # Loss
             losses = self.criterion(predictions, targets)
@@ -173,6 +175,7 @@ class Trainer:
             loss.backward()
             torch.nn.utils.clip_grad_norm_(self.model.parameters(), max_norm=1.0)
             self.optimizer.step()
+            self.model.invalidate_token_features()
 
             total_loss += loss.item()
             num_batches += 1
@@ -205,7 +208,8 @@ class Trainer:
                     'mask': batch['mask'].to(self.device)
                 }
 
-                predictions = self.model(composition_data)
+                padding_mask = ~targets['mask'].reshape(targets['mask'].shape[0], -1)
+                predictions = self.model(composition_data, padding_mask)
                 losses = self.criterion(predictions, targets)
 
                 total_loss += losses['total'].item()
@@ -266,7 +270,9 @@ class Trainer:
             'model_state_dict': self.model.state_dict(),
             'optimizer_state_dict': self.optimizer.state_dict(),
             'val_loss': val_loss,
-            'pack': self.pack
+            'pack': self.pack,
+            'num_sources': self.model.num_sources,
+            'model_config': self.model.config()
         }
 
         # 파일명
@@ -279,36 +285,309 @@ class Trainer:
         torch.save(checkpoint, filepath)
 
 
-async def train_pack_model(pack: str, num_epochs: int = 100):
+class DistillationLoss(nn.Module):
+    """
+    Teacher 출력 분포를 따라가는 student 손실 함수
+
+    소스 분포는 temperature로 부드럽게 한 KL divergence, 위치/볼륨은 teacher 예측과의 MSE
+    """
+
+    def __init__(self, temperature: float = 2.0, position_weight: float = 0.5, volume_weight: float = 0.3):
+        super().__init__()
+        self.temperature = temperature
+        self.position_weight = position_weight
+        self.volume_weight = volume_weight
+
+        self.mse_loss = nn.MSELoss()
+
+    def forward(
+        self,
+        student: Dict[str, torch.Tensor],
+        teacher: Dict[str, torch.Tensor],
+        mask: torch.Tensor
+    ) -> Dict[str, torch.Tensor]:
+        """
+        손실 계산
+
+        Args:
+            student: student 디코더 스텝별 예측 ('source_logits', 'positions', 'volumes')
+            teacher: 같은 입력에 대한 teacher 예측
+            mask: (batch, seq) - 유효한 디코딩 스텝
+
+        Returns:
+            손실 딕셔너리
+        """
+        T = self.temperature
+        student_log_probs = F.log_softmax(student['source_logits'][mask] / T, dim=-1)
+        teacher_log_probs = F.log_softmax(teacher['source_logits'][mask] / T, dim=-1)
+
+        # T^2로 스케일해 temperature와 무관하게 gradient 크기 유지
+        source_loss = F.kl_div(student_log_probs, teacher_log_probs, log_target=True, reduction='batchmean') * T * T
+        position_loss = self.mse_loss(student['positions'][mask], teacher['positions'][mask])
+        volume_loss = self.mse_loss(student['volumes'][mask], teacher['volumes'][mask])
+
+        total_loss = source_loss + self.position_weight * position_loss + self.volume_weight * volume_loss
+
+        return {
+            'total': total_loss,
+            'source': source_loss,
+            'position': position_loss,
+            'volume': volume_loss
+        }
+
+
+class DistillationTrainer:
+    """
+    학습된 teacher 모델에서 디코더 레이어가 적은 student 모델을 distillation으로 학습
+
+    서빙은 노이즈 메모리에서 디코더만으로 생성하므로, 같은 분포의 노이즈로 teacher가 샘플링한 씬을
+    teacher forcing 입력으로 사용한다 (DB 데이터 불필요). student는 teacher의 임베딩/인코더/출력 헤드와
+    균등 간격으로 고른 디코더 레이어로 초기화한다.
+    """
+
+    def __init__(
+        self,
+        teacher_path: str,
+        num_decoder_layers: int = 2,
+        device: str = "cuda" if torch.cuda.is_available() else "cpu",
+        learning_rate: float = 5e-4,
+        num_steps: int = 2000,
+        batch_size: int = 256,
+        checkpoint_dir: str = "./models/checkpoints"
+    ):
+        """
+        Args:
+            teacher_path: teacher 체크포인트 (CompositionGenerator.load 형식)
+            num_decoder_layers: student 디코더 레이어 수
+            num_steps: 학습 스텝 수 (스텝마다 teacher 샘플 배치를 새로 생성)
+            batch_size: 스텝당 씬 개수
+        """
+        self.device = device
+        self.num_steps = num_steps
+        self.batch_size = batch_size
+        self.checkpoint_dir = checkpoint_dir
+
+        os.makedirs(checkpoint_dir, exist_ok=True)
+
+        self.teacher = CompositionGenerator.load(teacher_path, device=device)
+        self.teacher.model.eval()
+        self.pack = self.teacher.pack
+
+        # 디코더 레이어 수만 줄인 student
+        self.student = CompositionGenerator(
+            pack=self.pack,
+            num_sources=self.teacher.num_sources,
+            device=device,
+            model_config={**self.teacher.model.config(), 'num_decoder_layers': num_decoder_layers}
+        )
+        self.student.source_mapping = self.teacher.source_mapping
+        self.student.version = f"{self.teacher.version}-distill{num_decoder_layers}"
+        self.model = self.student.model
+        self._init_from_teacher()
+
+        self.criterion = DistillationLoss()
+        self.optimizer = optim.AdamW(self.model.parameters(), lr=learning_rate, weight_decay=0.01)
+        self.scheduler = optim.lr_scheduler.CosineAnnealingLR(self.optimizer, T_max=num_steps)
+
+        # 고정 검증 배치 (스텝 간 손실 비교용)
+        self.val_batch = self.sample_batch(torch.Generator().manual_seed(0))
+
+        self.train_losses = []
+        self.val_losses = []
+
+        teacher_params = sum(p.numel() for p in self.teacher.parameters())
+        student_params = sum(p.numel() for p in self.model.parameters())
+        logger.info(f"DistillationTrainer initialized for {self.pack} on {device}")
+        logger.info(f"Teacher parameters: {teacher_params:,}, student parameters: {student_params:,}")
+
+    def _init_from_teacher(self):
+        """teacher 가중치로 student 초기화 (디코더는 균등 간격 레이어)"""
+        teacher = self.teacher.model
+        teacher_layers = teacher.num_decoder_layers
+        student_layers = self.model.num_decoder_layers
+
+        if student_layers == 1:
+            picked = [teacher_layers - 1]
+        else:
+            picked = [round(i * (teacher_layers - 1) / (student_layers - 1)) for i in range(student_layers)]
+
+        state = {
+            key: value for key, value in teacher.state_dict().items()
+            if not key.startswith('transformer_decoder.layers.')
+        }
+        for student_idx, teacher_idx in enumerate(picked):
+            prefix = f'transformer_decoder.layers.{teacher_idx}.'
+            for key, value in teacher.state_dict().items():
+                if key.startswith(prefix):
+                    state[f'transformer_decoder.layers.{student_idx}.' + key[len(prefix):]] = value
+
+        self.model.load_state_dict(state)
+        logger.info(f"Initialized student decoder from teacher layers {picked}")
+
+    @torch.no_grad()
+    def sample_batch(self, generator: Optional[torch.Generator] = None) -> Dict[str, torch.Tensor]:
+        """
+        서빙과 같은 분포(노이즈 메모리, 씬당 2~6개 소스)로 teacher가 샘플링한 씬 배치
+
+        Returns:
+            {'tokens': (batch, max_len) teacher forcing 입력, 'memory': (batch, 1, hidden), 'mask': (batch, max_len)}
+        """
+        teacher = self.teacher.model
+        max_len = self.teacher.max_scene_sources
+
+        memory = torch.randn(self.batch_size, 1, teacher.hidden_dim, generator=generator).to(self.device)
+        lengths = torch.randint(2, max_len + 1, (self.batch_size,), generator=generator)
+        uniforms = torch.rand(self.batch_size, max_len, generator=generator)
+
+        scenes = teacher.generate_scenes(memory, lengths, uniforms=uniforms)
+
+        # 입력은 시작 토큰 + 직전까지 생성한 소스 (패딩 위치는 마스크로 제외)
+        start = torch.full((self.batch_size, 1), teacher.start_token, dtype=torch.long, device=self.device)
+        source_ids = scenes['source_ids'].masked_fill(~scenes['mask'], teacher.start_token)
+        tokens = torch.cat([start, source_ids[:, :-1]], dim=1)
+
+        return {'tokens': tokens, 'memory': memory, 'mask': scenes['mask']}
+
+    @staticmethod
+    def _predict(model: CompositionTransformer, batch: Dict[str, torch.Tensor]) -> Dict[str, torch.Tensor]:
+        """teacher forcing으로 모든 디코딩 스텝의 예측을 한 번에 계산"""
+        output = model.decode_full(batch['tokens'], batch['memory'])
+        source_logits, positions, volumes = model.predict_heads(output)
+        return {'source_logits': source_logits, 'positions': positions, 'volumes': volumes}
+
+    def train_step(self) -> float:
+        """teacher 샘플 한 배치로 1 스텝 학습"""
+        batch = self.sample_batch()
+        with torch.no_grad():
+            teacher_predictions = self._predict(self.teacher.model, batch)
+
+        self.model.train()
+        losses = self.criterion(self._predict(self.model, batch), teacher_predictions, batch['mask'])
+        loss = losses['total']
+
+        self.optimizer.zero_grad()
+        loss.backward()
+        torch.nn.utils.clip_grad_norm_(self.model.parameters(), max_norm=1.0)
+        self.optimizer.step()
+        self.model.invalidate_token_features()
+        self.scheduler.step()
+
+        return loss.item()
+
+    def validate(self) -> Dict[str, float]:
+        """고정 검증 배치의 distillation 손실"""
+        self.model.eval()
+        with torch.no_grad():
+            losses = self.criterion(
+                self._predict(self.model, self.val_batch),
+                self._predict(self.teacher.model, self.val_batch),
+                self.val_batch['mask']
+            )
+
+        return {f'val_{name}': value.item() for name, value in losses.items()}
+
+    def train(self, eval_every: int = 100) -> Dict:
+        """
+        전체 distillation 루프 (검증 손실이 가장 낮은 student 저장)
+
+        Returns:
+            학습 결과 (최고 검증 손실, student 체크포인트 경로, 손실 기록)
+        """
+        best_val_loss = float('inf')
+        path = os.path.join(self.checkpoint_dir, f"{self.pack}_model_distill{self.model.num_decoder_layers}.pth")
+
+        logger.info(f"Starting distillation for {self.num_steps} steps")
+
+        for step in range(self.num_steps):
+            self.train_losses.append(self.train_step())
+
+            if (step + 1) % eval_every == 0 or step + 1 == self.num_steps:
+                val_metrics = self.validate()
+                val_loss = val_metrics['val_total']
+                self.val_losses.append(val_loss)
+
+                logger.info(
+                    f"Step {step + 1}/{self.num_steps} - "
+                    f"Train Loss: {sum(self.train_losses[-eval_every:]) / len(self.train_losses[-eval_every:]):.4f}, "
+                    f"Val Loss: {val_loss:.4f} (source KL: {val_metrics['val_source']:.4f})"
+                )
+
+                if val_loss < best_val_loss:
+                    best_val_loss = val_loss
+                    self.student.save(path)
+
+        logger.info(f"Distillation completed! Student saved to {path}")
+        return {
+            'best_val_loss': best_val_loss,
+            'checkpoint': path,
+            'train_losses': self.train_losses,
+            'val_losses': self.val_losses
+        }
+
+
+def distill_pack_model(
+    teacher_path: str,
+    num_decoder_layers: int = 2,
+    num_steps: int = 2000,
+    report_samples: int = 32
+) -> Dict:
+    """
+    teacher 체크포인트에서 student를 distillation하고 서빙 비교 리포트 출력
+
+    Args:
+        teacher_path: teacher 체크포인트 경로
+        num_decoder_layers: student 디코더 레이어 수
+        num_steps: 학습 스텝 수
+        report_samples: 비교 리포트의 변형별 생성 개수 (0이면 리포트 생략)
+
+    Returns:
+        학습 결과와 변형별 리포트 메트릭
+    """
+    from training.evaluation.serving_report import compare_generators, format_report
+
+    trainer = DistillationTrainer(teacher_path, num_decoder_layers=num_decoder_layers, num_steps=num_steps)
+    results = trainer.train()
+
+    if report_samples > 0:
+        student_path = results['checkpoint']
+        results['report'] = compare_generators(
+            {
+                "teacher": lambda: CompositionGenerator.load(teacher_path),
+                "student": lambda: CompositionGenerator.load(student_path),
+                "stud-int8": lambda: CompositionGenerator.load(student_path, quantize="int8")
+            },
+            num_samples=report_samples
+        )
+        logger.info("Teacher/student serving report:\n" + format_report(results['report']))
+
+    return results
+
+
+async def train_pack_model(pack: str, num_epochs: int = 100, cache_dir: Optional[str] = None):
     """
     특정 팩의 모델 학습
 
     Args:
         pack: 팩 종류
         num_epochs: 에폭 수
+        cache_dir: 학습 배열 디스크 캐시 디렉토리 (None이면 매번 MongoDB 전체 로드)
     """
     # MongoDB 연결
     await connect_to_mongo()
     db = get_database()
 
-    # 데이터 로드
+    # 데이터 로드 (projection된 문서를 스트리밍하며 바로 배열로 인코딩, 캐시가 있으면 추가분만)
     data_processor = DataProcessor(pack=pack, batch_size=32)
-    compositions = await data_processor.load_from_mongodb(db)
+    arrays = await data_processor.load_arrays(db, cache_dir)
+    num_compositions = len(arrays['source_ids'])
 
-    if len(compositions) < 10:
-        logger.warning(f"Not enough data for {pack} ({len(compositions)} compositions)")
+    if num_compositions < 10:
+        logger.warning(f"Not enough data for {pack} ({num_compositions} compositions)")
         logger.info("Need at least 10 compositions for training")
         return
 
-    # 데이터 증강
-    augmented_compositions = []
-    for comp in compositions:
-        augmented_compositions.extend(data_processor.augment_data(comp))
-
-    logger.info(f"Total compositions after augmentation: {len(augmented_compositions)}")
-
-    # DataLoader 생성
-    train_loader, val_loader = data_processor.create_dataloader(augmented_compositions)
+    # DataLoader 생성 (증강은 train 배치마다 즉석 적용)
+    train_loader, val_loader = data_processor.create_dataloader(arrays, augmentation=BatchAugmentation())
 
     # Trainer 생성 및 학습
     trainer = Trainer(pack=pack, num_epochs=num_epochs)
@@ -321,10 +600,22 @@ if __name__ == "__main__":
     import argparse
 
     parser = argparse.ArgumentParser()
-    parser.add_argument("--pack", type=str, required=True, choices=["adventure", "combat", "shelter"])
+    parser.add_argument("--pack", type=str, choices=["adventure", "combat", "shelter"])
     parser.add_argument("--epochs", type=int, default=100)
+    parser.add_argument(
+        "--cache-dir", type=str, default=os.getenv("TRAINING_CACHE_DIR") or None,
+        help="학습 배열 디스크 캐시 디렉토리 (기본: TRAINING_CACHE_DIR)"
+    )
+    parser.add_argument("--distill-from", type=str, default=None, help="teacher 체크포인트 (지정하면 distillation 모드)")
+    parser.add_argument("--student-decoder-layers", type=int, default=2)
+    parser.add_argument("--distill-steps", type=int, default=2000)
 
     args = parser.parse_args()
 
-    # 비동기 실행
-    asyncio.run(train_pack_model(args.pack, args.epochs))
+    if args.distill_from:
+        distill_pack_model(args.distill_from, args.student_decoder_layers, args.distill_steps)
+    elif args.pack is None:
+        parser.error("--pack is required unless --distill-from is given")
+    else:
+        # 비동기 실행
+        asyncio.run(train_pack_model(args.pack, args.epochs, args.cache_dir))